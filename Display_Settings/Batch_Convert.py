@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We convert the exports across a pool of processes.
+import concurrent.futures
+
+# We find the exports matching a glob.
+import glob
+
+# We process JSON files.
+import json
+
+# We create the output directories and count the CPU cores.
+import os
+
+# We time each conversion.
+import time
+
+# We optionally cache the conversions.
+import Conversion_Cache
+
+# We use the same conversion as Display_Settings.
+import Display_Settings
+
+# We output the converted settings in the same way as Display_Settings.
+import Settings_Output
+
+# We optionally measure each stage of the conversions.
+import Settings_Profiler
+
+def find_exports(sources):
+    '''Returns the sorted list of ZIP exports within the directories or matching the globs'''
+    zip_paths = set()
+
+    for source in sources:
+        # A directory includes all of the ZIP files beneath it.
+        if os.path.isdir(source):
+            source = os.path.join(source, '**', '*.zip')
+
+        # Otherwise treat the source as a glob (which also matches a single file name).
+        for zip_path in glob.glob(source, recursive=True):
+            if os.path.isfile(zip_path):
+                zip_paths.add(os.path.abspath(zip_path))
+
+    return sorted(zip_paths)
+
+def get_output_path(zip_path, input_root, output_directory, output_format = 'pretty', compress = False):
+    '''Returns the converted file name for an export, mirroring its location beneath the input root'''
+    relative_path = os.path.relpath(zip_path, input_root)
+    return os.path.join(output_directory, os.path.splitext(relative_path)[0] + '_Converted' + Settings_Output.get_output_extension(output_format, compress))
+
+# Each worker process keeps its own handle on each conversion cache (tracking the size it has added).
+worker_caches = {}
+
+def get_worker_cache(cache_directory, cache_bytes):
+    '''Returns this process's handle on a conversion cache'''
+    if (cache_directory, cache_bytes) not in worker_caches:
+        worker_caches[(cache_directory, cache_bytes)] = Conversion_Cache.ConversionCache(cache_directory, cache_bytes)
+    return worker_caches[(cache_directory, cache_bytes)]
+
+def convert_export(zip_path, output_path, decode = True, fix_booleans = True, stream = False, output_format = 'pretty', compress = False, cache_directory = None, cache_bytes = None, profile = False):
+    '''Converts a single export to its output file, returning the outcome rather than raising'''
+    result = {'input': zip_path, 'output': output_path, 'status': 'converted', 'error': None, 'cached': None}
+    start_time = time.perf_counter()
+    profiler = Settings_Profiler.SettingsProfiler() if profile else None
+
+    try:
+        # Make sure the output directory exists.
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+
+        # Convert the export in the same way as Display_Settings.
+        cache = get_worker_cache(cache_directory, cache_bytes) if cache_directory else None
+        with Settings_Output.open_output_file(output_path, compress) as output_file:
+            result['cached'] = Display_Settings.convert_settings_archive(zip_path, [output_file], output_format, stream, decode, fix_booleans, cache, profiler)
+    except Exception as error:
+        # A corrupt archive, a missing Settings_Data.json or malformed settings only fail this export.
+        result['status'] = 'failed'
+        result['error'] = type(error).__name__ + ': ' + str(error)
+
+    result['seconds'] = round(time.perf_counter() - start_time, 6)
+
+    # The report of each stage of this conversion.
+    if profiler is not None:
+        result['profile'] = profiler.report()
+
+    return result
+
+def _convert_export_arguments(arguments):
+    '''Unpacks the arguments for convert_export (as the process pool maps a single iterable)'''
+    return convert_export(*arguments)
+
+def convert_exports(zip_paths, output_directory, workers = None, decode = True, fix_booleans = True, stream = False, output_format = 'pretty', compress = False, cache_directory = None, cache_bytes = None, profile = False):
+    '''Converts the exports across a pool of processes and returns a summary of the run'''
+    start_time = time.perf_counter()
+
+    # The output mirrors the directory structure shared by the inputs.
+    input_root = os.path.commonpath([os.path.dirname(zip_path) for zip_path in zip_paths]) if zip_paths else ''
+    work = [(zip_path, get_output_path(zip_path, input_root, output_directory, output_format, compress), decode, fix_booleans, stream, output_format, compress, cache_directory, cache_bytes, profile) for zip_path in zip_paths]
+
+    # Send the exports to the workers in batches so the pool is not dominated by the cost of each hand-off.
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(work) // (workers * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_convert_export_arguments, work, chunksize=chunk_size))
+
+    # Summarise the run.
+    failures = [result for result in results if result['status'] == 'failed']
+    seconds = [result['seconds'] for result in results]
+
+    summary = {
+        'workers': workers,
+        'total': len(results),
+        'converted': len(results) - len(failures),
+        'failed': len(failures),
+        'cache_hits': sum(1 for result in results if result['cached'] is True),
+        'cache_misses': sum(1 for result in results if result['cached'] is False),
+        'wall_seconds': round(time.perf_counter() - start_time, 6),
+        'conversion_seconds': round(sum(seconds), 6),
+        'slowest_seconds': max(seconds, default=0),
+        'failures': failures,
+        'results': results
+    }
+
+    # Aggregate the reports of each stage across the run.
+    if profile:
+        summary['profile'] = Settings_Profiler.merge_reports(result['profile'] for result in results if 'profile' in result)
+
+    return summary
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Converts a directory (or glob) of Bosch EasyControl settings exports in parallel.')
+
+    # Arguments to control which exports are converted and where to.
+    parser.add_argument('sources', nargs='+', help='Directories containing settings ZIP files or globs matching them.')
+    parser.add_argument('-o', '--output', default='Converted', help='The directory to write the converted settings and the summary to (default: %(default)s).')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='The number of worker processes (default: the number of CPU cores).')
+    parser.add_argument('-s', '--stream', action='store_true', help='Convert each export with bounded memory (see Display_Settings --stream).')
+    parser.add_argument('-f', '--format', choices=Settings_Output.output_formats, default='pretty', help='Pretty-printed JSON, compact JSON or a JSON line per setting (NDJSON) (default: %(default)s).')
+    parser.add_argument('-z', '--gzip', action='store_true', help='Compress the converted files with gzip.')
+    parser.add_argument('-c', '--cache', help='A directory to cache conversions in, so unchanged settings are not converted again.')
+    parser.add_argument('--cache-size', type=int, default=1024, help='The maximum size of the cache in MB (the least recently used conversions are evicted) (default: %(default)s).')
+    parser.add_argument('-p', '--profile', action='store_true', help='Measure the wall time, CPU time and peak allocation of each stage of each conversion (reported in the summary).')
+    parser.add_argument('--no-decode', dest='decode', action='store_false', help='Do not decode the known encoded values.')
+    parser.add_argument('--no-fix-booleans', dest='fix_booleans', action='store_false', help='Do not fix the boolean types.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    # Find the exports to convert.
+    zip_paths = find_exports(args.sources)
+    if not zip_paths:
+        print('No ZIP files were found to convert.')
+        return
+
+    # Convert them all.
+    summary = convert_exports(zip_paths, args.output, args.workers, args.decode, args.fix_booleans, args.stream, args.format, args.gzip, args.cache, args.cache_size * 1024 * 1024, args.profile)
+
+    # Write the summary of failures and timings.
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'Batch_Summary.json'), mode='w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    # Output the failures and the totals to the console.
+    for failure in summary['failures']:
+        print('Failed: ' + failure['input'] + ' (' + failure['error'] + ')')
+
+    print('Converted ' + str(summary['converted']) + ' of ' + str(summary['total']) + ' exports in ' + format(summary['wall_seconds'], '.2f') + ' seconds using ' + str(summary['workers']) + ' workers.')
+    if args.cache:
+        print('Conversion cache: ' + str(summary['cache_hits']) + ' hits, ' + str(summary['cache_misses']) + ' misses.')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We process JSON files.
+import json
+
+# We write the serialised output nowhere.
+import os
+
+# We record the Python version with the results.
+import platform
+
+# We generate random device keys.
+import random
+
+# We generate the synthetic export in a temporary directory.
+import tempfile
+
+# We time the benchmarks.
+import time
+import timeit
+
+# We measure the peak memory of each stage.
+import tracemalloc
+
+# We process ZIP files.
+import zipfile
+
+# We benchmark the Display_Settings functions.
+import Display_Settings
+
+# We generate a synthetic export when one is not provided.
+import Generate_Settings
+
+# We benchmark the device key conversion.
+import Homematic_IP_Key
+
+# We benchmark the serialisation.
+import Settings_Output
+
+# We benchmark reading a few settings through the lazily converted view.
+import Settings_View
+
+# Setting paths in the shapes found in an export (a mix of encoded and plain settings).
+example_setting_paths = [
+    ['devices', 'device1'],
+    ['devices', 'device1', 'name'],
+    ['energy', 'currency'],
+    ['events', 'ev1'],
+    ['gateway', 'installer', 'email'],
+    ['gateway', 'user', 'address'],
+    ['heatingCircuits', 'hc1', 'actualSupplyTemperature'],
+    ['heatingCircuits', 'hc1', 'heatCurveMax'],
+    ['system', 'autoAway', 'users', 'user1', 'name'],
+    ['system', 'sensors', 'temperatures', 'outdoor_t1'],
+    ['zones', 'zn1', 'name'],
+    ['zones', 'zn1', 'temperatureHeatingSetpoint']
+]
+
+def iterate_rules(rules):
+    '''Yields each (pattern, decoder) rule held in an encoded path registry'''
+    for lengths in rules.values():
+        for shapes in lengths.values():
+            for get_fixed_components, patterns in shapes.values():
+                yield from patterns.values()
+
+def benchmark_rule_scaling(rule_counts = (0, 100, 1000, 10000), repeat = 5, number = 2000):
+    '''Returns the cost of finding the encoded path rule for each setting as the number of registered rules grows'''
+    results = []
+    known_rules = list(iterate_rules(Display_Settings.encoded_path_rules))
+
+    for rule_count in rule_counts:
+        # Start from the rules that are already known.
+        rules = {}
+        for pattern, decoder in known_rules:
+            Display_Settings.register_encoded_path(pattern, decoder, rules)
+
+        # Add synthetic rules alongside the real ones (including sharing their first components) to grow the registry.
+        for index in range(rule_count):
+            Display_Settings.register_encoded_path(['zones/*/synthetic', 'gateway/user/synthetic', 'synthetic'][index % 3] + str(index) + '/*/name', None, rules)
+
+        # Time a lookup of every example setting path.
+        timer = timeit.Timer(lambda: [Display_Settings.find_encoded_path_rule(setting_path, rules) for setting_path in example_setting_paths])
+        best_seconds = min(timer.repeat(repeat=repeat, number=number))
+
+        results.append({'rules': len(known_rules) + rule_count, 'nanoseconds_per_setting': best_seconds / (number * len(example_setting_paths)) * 1e9})
+
+    return results
+
+def legacy_integer_to_homematic_ip_key(number):
+    '''The original (prepending) conversion of integer number to Homematic IP key that the codec is compared against'''
+    homematic_ip_alphabet = '0123456789ABCEFGHJKLMNPQRSTUWXYZ'
+    result = ''
+    while number > 0:
+        result = homematic_ip_alphabet[number & 0b11111] + result
+        if len(result) in [6,12,18,24]:
+            result = '-' + result
+        number >>= 5
+    return result
+
+def benchmark_homematic_ip_key(device_count = 1000, repeat = 5, number = 20, seed = 1471):
+    '''Returns the cost of converting a list of hexadecimal device keys with the original function and the codec'''
+
+    # Device keys are 96 bit, but include shorter keys to cover the dash placement.
+    random_generator = random.Random(seed)
+    hex_keys = [format(random_generator.getrandbits(random_generator.choice([30, 60, 96, 96, 96])), 'X') for _ in range(device_count)]
+
+    # The codec must give the same keys as the original function and decode them back again.
+    legacy_keys = [legacy_integer_to_homematic_ip_key(int(hex_key, 16)) for hex_key in hex_keys]
+    if Homematic_IP_Key.hex_to_homematic_ip_keys(hex_keys) != legacy_keys:
+        raise AssertionError('The codec does not match the original conversion.')
+    if [int(hex_key, 16) for hex_key in Homematic_IP_Key.homematic_ip_keys_to_hex(legacy_keys)] != [int(hex_key, 16) for hex_key in hex_keys]:
+        raise AssertionError('The codec does not decode the keys back to the device keys.')
+
+    def cached_batch():
+        Homematic_IP_Key.hex_to_homematic_ip_keys(hex_keys)
+
+    def uncached_batch():
+        Homematic_IP_Key.hex_to_homematic_ip_key.cache_clear()
+        Homematic_IP_Key.hex_to_homematic_ip_keys(hex_keys)
+
+    results = []
+    for name, function in [
+        ('original', lambda: [legacy_integer_to_homematic_ip_key(int(hex_key, 16)) for hex_key in hex_keys]),
+        ('codec', lambda: [Homematic_IP_Key.encode_homematic_ip_key(int(hex_key, 16)) for hex_key in hex_keys]),
+        ('batch (uncached)', uncached_batch),
+        ('batch (cached)', cached_batch)
+    ]:
+        best_seconds = min(timeit.Timer(function).repeat(repeat=repeat, number=number))
+        results.append({'name': name, 'nanoseconds_per_key': best_seconds / (number * device_count) * 1e9})
+
+    return results
+
+def measure_stage(setup, stage, repeat = 5):
+    '''Returns the best time and the peak memory allocated by a stage (setup prepares its input outside of the measurement)'''
+    best_seconds = float('inf')
+    for _ in range(repeat):
+        stage_input = setup()
+        start_time = time.perf_counter()
+        stage(stage_input)
+        best_seconds = min(best_seconds, time.perf_counter() - start_time)
+
+    # Tracing the allocations slows the stage down, so the peak is measured on a separate run.
+    stage_input = setup()
+    tracemalloc.start()
+    stage(stage_input)
+    peak_bytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best_seconds, peak_bytes
+
+def benchmark_pipeline(zip_path, repeat = 5):
+    '''Returns the throughput and peak memory of each stage of converting an export (parsing, decoding, building the tree and serialising)'''
+
+    # Read the export once so every stage starts from the same data.
+    with zipfile.ZipFile(zip_path) as settings_archive:
+        settings_data = settings_archive.read('Settings_Data.json')
+    settings_count = len(json.loads(settings_data))
+
+    def parse():
+        return json.loads(settings_data)
+
+    def decode(settings_json_list):
+        return [(Display_Settings.convert_easycontrol_setting(setting_value), setting_value) for setting_value in settings_json_list]
+
+    def build(settings_entries):
+        return Display_Settings.build_settings_dictionary(settings_entries)
+
+    def read_heating_circuits(settings):
+        # A monitoring job only reads the heating circuit values.
+        return [setting.get('value') for heating_circuit in settings.get('heatingCircuits', {}).values() for setting in heating_circuit.values()]
+
+    # The serialised output is discarded.
+    converted_json_settings = Display_Settings.convert_easycontrol_json_list(parse())
+    null_output = open(os.devnull, mode='w', encoding='utf-8')
+
+    stages = [
+        ('parse', lambda: None, lambda _: parse()),
+        ('decode', parse, decode),
+        ('tree', lambda: decode(parse()), build),
+        ('read (eager)', parse, lambda settings_json_list: read_heating_circuits(Display_Settings.convert_easycontrol_json_list(settings_json_list))),
+        ('read (view)', parse, lambda settings_json_list: read_heating_circuits(Settings_View.view_easycontrol_json_list(settings_json_list))),
+        ('serialize (pretty)', lambda: converted_json_settings, lambda settings: Settings_Output.write_settings(settings, [null_output], 'pretty')),
+        ('serialize (compact)', lambda: converted_json_settings, lambda settings: Settings_Output.write_settings(settings, [null_output], 'compact'))
+    ]
+
+    results = {}
+    with null_output:
+        for name, setup, stage in stages:
+            seconds, peak_bytes = measure_stage(setup, stage, repeat)
+            results[name] = {'seconds': seconds, 'settings_per_second': settings_count / seconds, 'megabytes_per_second': len(settings_data) / seconds / 1e6, 'peak_bytes': peak_bytes}
+
+    return {'settings': settings_count, 'bytes': len(settings_data), 'stages': results}
+
+def load_results(results_path):
+    '''Returns the benchmark results stored previously (one JSON object per line)'''
+    if not os.path.exists(results_path):
+        return []
+
+    with open(results_path, mode='r', encoding='utf-8') as results_file:
+        return [json.loads(line) for line in results_file if line.strip()]
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Benchmarks the Display_Settings conversion.')
+
+    # Arguments to control the benchmarks.
+    parser.add_argument('zip_file', nargs='?', help='The settings ZIP file to benchmark the conversion of (default: a synthetic export).')
+    parser.add_argument('-n', '--number', type=int, default=2000, help='The number of times each benchmark is run per repeat (default: %(default)s).')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='The number of repeats (the best is reported) (default: %(default)s).')
+    parser.add_argument('--zones', type=int, default=200, help='The number of zones in the synthetic export (default: %(default)s).')
+    parser.add_argument('--programs', type=int, default=200, help='The number of programs in the synthetic export (default: %(default)s).')
+    parser.add_argument('--devices', type=int, default=1000, help='The number of devices in the synthetic export (default: %(default)s).')
+    parser.add_argument('--events', type=int, default=2000, help='The number of events in the synthetic export (default: %(default)s).')
+    parser.add_argument('--users', type=int, default=100, help='The number of auto away users in the synthetic export (default: %(default)s).')
+    parser.add_argument('--results', default='Benchmark_Results.jsonl', help='The file the results are appended to and compared against (default: %(default)s).')
+    parser.add_argument('--label', default='', help='A label for these results (e.g. the version being benchmarked).')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    # The results of this run.
+    results = {'label': args.label, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': platform.python_version()}
+
+    # The cost of each setting's encoded path lookup should stay flat as rules are added.
+    print('Encoded path rule lookup:')
+    results['rule_lookup'] = benchmark_rule_scaling(repeat=args.repeat, number=args.number)
+    for result in results['rule_lookup']:
+        print('  {rules:>6} rules: {nanoseconds_per_setting:8.1f} ns per setting'.format(**result))
+
+    # The device key codec compared to the original conversion.
+    print('Homematic IP device key conversion:')
+    results['homematic_ip_key'] = benchmark_homematic_ip_key(repeat=args.repeat)
+    for result in results['homematic_ip_key']:
+        print('  {name:>16}: {nanoseconds_per_key:8.1f} ns per key'.format(**result))
+
+    # Each stage of the conversion of a whole export.
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        if args.zip_file:
+            zip_path = args.zip_file
+            results['export'] = {'zip_file': os.path.basename(zip_path)}
+        else:
+            zip_path = os.path.join(temporary_directory, 'Settings_Synthetic.zip')
+            results['export'] = {'zones': args.zones, 'programs': args.programs, 'devices': args.devices, 'events': args.events, 'users': args.users}
+            Generate_Settings.write_settings_archive(zip_path, Generate_Settings.generate_settings(args.zones, args.programs, args.devices, args.events, args.users))
+
+        pipeline = benchmark_pipeline(zip_path, args.repeat)
+
+    results['export'].update(settings=pipeline['settings'], bytes=pipeline['bytes'])
+    results['pipeline'] = pipeline['stages']
+
+    # Compare against the most recent results for the same export.
+    previous_results = [previous for previous in load_results(args.results) if previous.get('export') == results['export']]
+    previous_stages = previous_results[-1]['pipeline'] if previous_results else {}
+
+    print('Conversion of ' + str(pipeline['settings']) + ' settings (' + format(pipeline['bytes'] / 1e6, '.1f') + ' MB)' + (' compared to \'' + previous_results[-1]['label'] + '\' (' + previous_results[-1]['timestamp'] + ')' if previous_results else '') + ':')
+    for name, stage in results['pipeline'].items():
+        line = '  {name:>19}: {milliseconds:9.1f} ms {settings_per_second:12,.0f} settings/s {megabytes_per_second:8.1f} MB/s {peak_megabytes:8.1f} MB peak'.format(name=name, milliseconds=stage['seconds'] * 1000, peak_megabytes=stage['peak_bytes'] / 1e6, **stage)
+        if name in previous_stages:
+            line += ' ({:+.1%} time)'.format(stage['seconds'] / previous_stages[name]['seconds'] - 1)
+        print(line)
+
+    # Store the results so later versions can be compared.
+    with open(args.results, mode='a', encoding='utf-8') as results_file:
+        results_file.write(json.dumps(results, sort_keys=True) + '\n')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We provide the store as a context manager.
+import contextlib
+
+# We manage the cached files.
+import os
+
+# We write the cached files atomically.
+import tempfile
+
+# Increase this when a change to the conversion changes its output (so older cached conversions are not used).
+cache_format_version = 2
+
+# The cached conversions are files with this extension in the cache directory.
+cache_file_extension = '.cache'
+
+class ConversionCache:
+    '''A size-bounded directory of converted outputs keyed on the Settings_Data.json CRC and size and the converter options, evicting the least recently used'''
+
+    def __init__(self, directory, maximum_bytes = 1024 * 1024 * 1024, rescan_interval = 64):
+        self.directory = directory
+        self.maximum_bytes = maximum_bytes
+        self.rescan_interval = rescan_interval
+        self.statistics = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0}
+
+        # The total size is scanned once and then tracked (other processes sharing the cache are picked up on each rescan).
+        self.total_bytes = None
+        self.stores_since_scan = 0
+
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(settings_info, decode = True, fix_booleans = True, output_format = 'pretty', encoder = 'json'):
+        '''Returns the cache key for the Settings_Data.json ZipInfo (its CRC and size are known without decompressing it), the converter options and the library that encoded the output'''
+        return '{:08x}-{}-{}{}-{}-{}-v{}'.format(settings_info.CRC, settings_info.file_size, int(decode), int(fix_booleans), output_format, encoder, cache_format_version)
+
+    def get_path(self, key):
+        '''Returns the path of the cached file for a key'''
+        return os.path.join(self.directory, key + cache_file_extension)
+
+    def read(self, key, output_files, buffer_size = 65536):
+        '''Writes the cached conversion to the output files, returning whether there was one'''
+        cache_path = self.get_path(key)
+
+        try:
+            with open(cache_path, mode='r', encoding='utf-8') as cache_file:
+                while True:
+                    text = cache_file.read(buffer_size)
+                    if not text:
+                        break
+                    for output_file in output_files:
+                        output_file.write(text)
+
+            # Mark the entry as recently used.
+            os.utime(cache_path)
+        except FileNotFoundError:
+            # Not cached (or evicted by another process).
+            self.statistics['misses'] += 1
+            return False
+
+        self.statistics['hits'] += 1
+        return True
+
+    @contextlib.contextmanager
+    def store(self, key):
+        '''Provides a file to write the conversion to, which is added to the cache only if the conversion completes'''
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+
+        try:
+            with open(file_descriptor, mode='w', encoding='utf-8') as cache_file:
+                yield cache_file
+
+            # Replacing is atomic, so a concurrent reader sees either the whole file or none of it.
+            os.replace(temporary_path, self.get_path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+
+        self.statistics['stores'] += 1
+        self.stores_since_scan += 1
+
+        # Track the size and evict once the cache is too large.
+        if self.total_bytes is None or self.stores_since_scan >= self.rescan_interval:
+            self.evict()
+        else:
+            self.total_bytes += os.path.getsize(self.get_path(key))
+            if self.total_bytes > self.maximum_bytes:
+                self.evict()
+
+    def scan(self):
+        '''Returns the cached files as (last used, size, path) ordered from the least recently used'''
+        entries = []
+
+        with os.scandir(self.directory) as directory_entries:
+            for directory_entry in directory_entries:
+                if directory_entry.name.endswith(cache_file_extension):
+                    try:
+                        file_status = directory_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((file_status.st_mtime, file_status.st_size, directory_entry.path))
+
+        entries.sort()
+        return entries
+
+    def evict(self):
+        '''Removes the least recently used cached files until the cache fits within its maximum size'''
+        entries = self.scan()
+        self.total_bytes = sum(size for last_used, size, cache_path in entries)
+        self.stores_since_scan = 0
+
+        for last_used, size, cache_path in entries:
+            if self.total_bytes <= self.maximum_bytes:
+                break
+
+            try:
+                os.remove(cache_path)
+                self.statistics['evictions'] += 1
+            except FileNotFoundError:
+                # Another process evicted it first.
+                pass
+
+            self.total_bytes -= size
+
+    def clear(self):
+        '''Removes every cached file'''
+        for last_used, size, cache_path in self.scan():
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(cache_path)
+        self.total_bytes = 0
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Shows (or clears) a Display_Settings conversion cache.')
+
+    # Arguments to control the cache.
+    parser.add_argument('cache_directory', help='The conversion cache directory.')
+    parser.add_argument('--clear', action='store_true', help='Remove every cached conversion.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    cache = ConversionCache(args.cache_directory)
+    if args.clear:
+        cache.clear()
+
+    # Output the size of the cache.
+    entries = cache.scan()
+    print(str(len(entries)) + ' cached conversions using ' + format(sum(size for last_used, size, cache_path in entries) / 1e6, '.1f') + ' MB.')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We hash the settings to skip unchanged subtrees.
+import hashlib
+
+# We wrap the binary ZIP file member as text.
+import io
+
+# We process JSON files.
+import json
+
+# We process ZIP files.
+import zipfile
+
+# We use the same conversion as Display_Settings.
+import Display_Settings
+
+def index_settings(settings_iterable, decode = True, fix_booleans = True):
+    '''Returns a dictionary of setting path (tuple) to converted setting'''
+    settings_index = {}
+
+    # Index each converted (and so decoded) setting by its path (a repeated setting ID overwrites the earlier value).
+    for setting_value in settings_iterable:
+        settings_index[tuple(Display_Settings.convert_easycontrol_setting(setting_value, decode, fix_booleans))] = setting_value
+
+    return settings_index
+
+def load_settings_index(settings_path, decode = True, fix_booleans = True):
+    '''Returns a dictionary of setting path (tuple) to converted setting from a settings ZIP export or its raw JSON list'''
+
+    # Accept either the exported ZIP file or the Settings_Data.json extracted from it.
+    if zipfile.is_zipfile(settings_path):
+        with zipfile.ZipFile(settings_path) as settings_archive:
+            with settings_archive.open('Settings_Data.json', mode='r') as settings_file:
+                return index_settings(Display_Settings.iterate_json_list(io.TextIOWrapper(settings_file, encoding='utf-8-sig')), decode, fix_booleans)
+
+    with open(settings_path, mode='r', encoding='utf-8-sig') as settings_file:
+        return index_settings(Display_Settings.iterate_json_list(settings_file), decode, fix_booleans)
+
+def get_canonical_json(value):
+    '''Returns the canonical JSON text for a value (the form that is both hashed and compared, so 1, 1.0 and true all differ)'''
+    return json.dumps(value, sort_keys=True, separators=(',', ':'))
+
+def get_setting_digest(settings_path, setting_value):
+    '''Returns a digest of a converted setting together with its path as an integer'''
+    canonical_setting = get_canonical_json(list(settings_path)) + '\0' + get_canonical_json(setting_value)
+    return int.from_bytes(hashlib.blake2b(canonical_setting.encode('utf-8'), digest_size=16).digest(), 'big')
+
+def index_subtrees(settings_index):
+    '''Returns the digest of each setting, the digest of each subtree (combining the settings beneath it) and the child components of each subtree'''
+    setting_digests = {}
+    subtree_digests = {}
+    subtree_children = {}
+
+    for settings_path, setting_value in settings_index.items():
+        # The path is hashed with the value so a setting moving subtree (or two settings swapping values) is a change.
+        setting_digest = get_setting_digest(settings_path, setting_value)
+        setting_digests[settings_path] = setting_digest
+
+        # Every subtree containing the setting combines its digest (XOR does not depend on the order the settings are seen in).
+        for depth in range(len(settings_path)):
+            prefix = settings_path[:depth]
+            subtree_digests[prefix] = subtree_digests.get(prefix, 0) ^ setting_digest
+            subtree_children.setdefault(prefix, set()).add(settings_path[depth])
+
+    return setting_digests, subtree_digests, subtree_children
+
+def get_json_pointer(settings_path):
+    '''Returns the JSON pointer for a setting path (the same as the setting ID)'''
+    return ''.join('/' + component.replace('~', '~0').replace('/', '~1') for component in settings_path)
+
+def diff_setting(settings_path, old_setting, new_setting, changes):
+    '''Appends the JSON patch operations that turn one setting into another'''
+    pointer = get_json_pointer(settings_path)
+
+    if old_setting is None:
+        changes.append({'op': 'add', 'path': pointer, 'value': new_setting})
+    elif new_setting is None:
+        changes.append({'op': 'remove', 'path': pointer})
+    else:
+        # Only the fields of the setting that changed are reported (compared as they are hashed, so 1 becoming true is a change).
+        for field in sorted(old_setting.keys() | new_setting.keys()):
+            if field not in new_setting:
+                changes.append({'op': 'remove', 'path': pointer + get_json_pointer([field])})
+            elif field not in old_setting:
+                changes.append({'op': 'add', 'path': pointer + get_json_pointer([field]), 'value': new_setting[field]})
+            elif get_canonical_json(old_setting[field]) != get_canonical_json(new_setting[field]):
+                changes.append({'op': 'replace', 'path': pointer + get_json_pointer([field]), 'value': new_setting[field]})
+
+def diff_settings(old_settings_index, new_settings_index):
+    '''Returns the JSON patch operations (ordered by path) that turn the old settings in to the new settings'''
+    old_setting_digests, old_subtree_digests, old_subtree_children = index_subtrees(old_settings_index)
+    new_setting_digests, new_subtree_digests, new_subtree_children = index_subtrees(new_settings_index)
+    changes = []
+
+    def diff_subtree(prefix):
+        # Skip an unchanged subtree without looking at any of the settings within it.
+        if old_subtree_digests.get(prefix) == new_subtree_digests.get(prefix):
+            return
+
+        for component in sorted(old_subtree_children.get(prefix, set()) | new_subtree_children.get(prefix, set())):
+            settings_path = prefix + (component,)
+
+            # Compare the setting at this path.
+            if old_setting_digests.get(settings_path) != new_setting_digests.get(settings_path):
+                diff_setting(settings_path, old_settings_index.get(settings_path), new_settings_index.get(settings_path), changes)
+
+            # Compare the settings beneath this path.
+            if settings_path in old_subtree_children or settings_path in new_subtree_children:
+                diff_subtree(settings_path)
+
+    diff_subtree(())
+    return changes
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Outputs the changes between two Bosch EasyControl settings exports as JSON patch operations.')
+
+    # Arguments to control which exports are compared and how.
+    parser.add_argument('old_file', help='The earlier settings ZIP file (or its Settings_Data.json).')
+    parser.add_argument('new_file', help='The later settings ZIP file (or its Settings_Data.json).')
+    parser.add_argument('-o', '--output', help='Also write the changes to this file.')
+    parser.add_argument('--no-decode', dest='decode', action='store_false', help='Compare the values as they were encoded.')
+    parser.add_argument('--no-fix-booleans', dest='fix_booleans', action='store_false', help='Do not fix the boolean types before comparing.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    # Compare the two exports.
+    changes = diff_settings(load_settings_index(args.old_file, args.decode, args.fix_booleans), load_settings_index(args.new_file, args.decode, args.fix_booleans))
+
+    # One operation per line keeps the change set compact but readable.
+    formatted_changes = '[' + ','.join('\n  ' + json.dumps(change, sort_keys=True) for change in changes) + ('\n]' if changes else ']')
+
+    # Output the changes to the console.
+    print(formatted_changes)
+
+    # Write the changes to the output file.
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as output_file:
+            output_file.write(formatted_changes)
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -16,141 +16,617 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+# We parse command line arguments.
+import argparse
+
 # We decode some of the base64 values.
 import base64
 
+# We merge sorted runs of settings when streaming.
+import heapq
+
+# We wrap the binary ZIP file member as text when streaming.
+import io
+
 # We process JSON files.
 import json
 
+# We look up the fixed components of the encoded paths.
+import operator
+
+# We match JSON whitespace when streaming.
+import re
+
 # We read command line arguments.
 import sys
 
+# We spool sorted runs of settings to temporary files when streaming.
+import tempfile
+
 # We process ZIP files.
 import zipfile
 
-# Thanks to https://homematic-forum.de/forum/viewtopic.php?t=65434
+# We optionally cache the conversions.
+import Conversion_Cache
+
+# We convert the device keys.
+import Homematic_IP_Key
+
+# We output the converted settings.
+import Settings_Output
+
+# We optionally measure each stage of the conversion.
+import Settings_Profiler
+
+# JSON whitespace that may appear between the items of a JSON list.
+json_whitespace = re.compile(r'[ \t\n\r]*')
+
 def integer_to_homematic_ip_key(number):
     '''Converts integer number to Homematic IP key'''
-    homematic_ip_alphabet = '0123456789ABCEFGHJKLMNPQRSTUWXYZ'
-    result = ''
-    while number > 0:
-        result = homematic_ip_alphabet[number & 0b11111] + result
-        if len(result) in [6,12,18,24]:
-            result = '-' + result
-        number >>= 5
-    return result
+    return Homematic_IP_Key.encode_homematic_ip_key(number)
+
+def decode_base64_text(encoded_text):
+    '''Decodes Base64 encoded UTF-8 text'''
+    return base64.b64decode(encoded_text).decode('utf-8')
+
+def decode_hex_homematic_ip_key(hex_key):
+    '''Decodes a hexadecimal device key to a Homematic IP key'''
+    return Homematic_IP_Key.hex_to_homematic_ip_key(hex_key)
+
+def value_decoder(decode_function):
+    '''Returns a decoder that decodes the whole value of a setting'''
+    def decode_value(setting_value):
+        setting_value['value'] = decode_function(setting_value['value'])
+        return 1
+    return decode_value
+
+def record_decoder(field_decoders):
+    '''Returns a decoder that decodes the fields of a setting whose value is a list holding a single record'''
+    def decode_record(setting_value):
+        # Only a single record is decoded.
+        if len(setting_value['value']) != 1:
+            return 0
+
+        record = setting_value['value'][0]
+        for field, decode_function in field_decoders.items():
+            record[field] = decode_function(record[field])
+        return len(field_decoders)
+    return decode_record
+
+# The encoded paths are compiled into a dictionary keyed on the first component and then the path length (so most settings without a rule cost a single lookup).
+# Each entry holds the shapes of its patterns (most specific first), each a getter for the fixed components ('*' matches any component) and the rules by those components.
+encoded_path_rules = {}
+
+def register_encoded_path(pattern, decoder, rules = encoded_path_rules):
+    '''Registers a decoder for the settings matching a path pattern (e.g. 'zones/*/name')'''
+    components = pattern.split('/')
+
+    # The first component is part of the key so it cannot be a wildcard.
+    if components[0] == '*':
+        raise ValueError('The encoded path pattern "' + pattern + '" cannot start with a wildcard.')
+
+    fixed_positions = tuple(index for index in range(1, len(components)) if components[index] != '*')
+    shapes = rules.setdefault(components[0], {}).setdefault(len(components), {})
+
+    if fixed_positions not in shapes:
+        shapes[fixed_positions] = (operator.itemgetter(*fixed_positions) if fixed_positions else lambda setting_path: None, {})
+
+        # Exact components take priority over wildcards (from the first component on).
+        sorted_shapes = sorted(shapes.items(), key=lambda shape: [index not in shape[0] for index in range(1, len(components))])
+        shapes.clear()
+        shapes.update(sorted_shapes)
+
+    get_fixed_components, patterns = shapes[fixed_positions]
+    patterns[get_fixed_components(components)] = (pattern, decoder)
+
+def find_encoded_path_rule(setting_path, rules = encoded_path_rules):
+    '''Returns the (pattern, decoder) rule registered for a setting path or None (exact components take priority over wildcards)'''
+    lengths = rules.get(setting_path[0])
+    if lengths is None:
+        return None
+
+    shapes = lengths.get(len(setting_path))
+    if shapes is None:
+        return None
+
+    # Only the patterns with the same length and first component are checked, each shape by a single lookup of its fixed components.
+    for get_fixed_components, patterns in shapes.values():
+        rule = patterns.get(get_fixed_components(setting_path))
+        if rule is not None:
+            return rule
+    return None
+
+# The settings that the mobile application exports encoded.
+for pattern, decoder in [
+    # Connected devices.
+    ('devices/*', record_decoder({'dlk': decode_hex_homematic_ip_key, 'name': decode_base64_text})),
+    # Energy currency.
+    ('energy/currency', value_decoder(decode_base64_text)),
+    # Events.
+    ('events/*', record_decoder({'name': decode_base64_text})),
+    # Zone, program or device names.
+    ('zones/*/name', value_decoder(decode_base64_text)),
+    ('programs/*/name', value_decoder(decode_base64_text)),
+    ('devices/*/name', value_decoder(decode_base64_text)),
+    # Gateway user address.
+    ('gateway/user/address', record_decoder({'address': decode_base64_text, 'city': decode_base64_text, 'country': decode_base64_text, 'state': decode_base64_text, 'zip': decode_base64_text})),
+    # Gateway user name, email or phone.
+    ('gateway/user/name', value_decoder(decode_base64_text)),
+    ('gateway/user/email', value_decoder(decode_base64_text)),
+    ('gateway/user/phone', value_decoder(decode_base64_text)),
+    # Gateway installer companyName, contactName, email or phone.
+    ('gateway/installer/companyName', value_decoder(decode_base64_text)),
+    ('gateway/installer/contactName', value_decoder(decode_base64_text)),
+    ('gateway/installer/email', value_decoder(decode_base64_text)),
+    ('gateway/installer/phone', value_decoder(decode_base64_text)),
+    # Auto away users.
+    ('system/autoAway/users/*/name', value_decoder(decode_base64_text))
+]:
+    register_encoded_path(pattern, decoder)
 
 def decode_known_encoded_paths(setting_path, setting_value):
+    # Find the rule for this setting (if it is one of the known encoded paths).
+    rule = find_encoded_path_rule(setting_path)
 
-    if len(setting_path) == 2:
-        # Connected devices.
-        if setting_path[0] == 'devices':
-            if len(setting_value['value']) == 1:
-                setting_value['value'][0]['dlk'] = integer_to_homematic_ip_key(int(setting_value['value'][0]['dlk'], 16))
-                setting_value['value'][0]['name'] = base64.b64decode(setting_value['value'][0]['name']).decode('utf-8')
-        # Energy currency.
-        elif setting_path[0] == 'energy' and setting_path[1] == 'currency':
-            setting_value['value'] = base64.b64decode(setting_value['value']).decode('utf-8')
-        # Events.
-        elif setting_path[0] == 'events':
-            if len(setting_value['value']) == 1:
-                setting_value['value'][0]['name'] = base64.b64decode(setting_value['value'][0]['name']).decode('utf-8')
-
-    elif len(setting_path) == 3:
-        # Zone, program or device names.
-        if setting_path[0] in ['zones', 'programs', 'devices'] and setting_path[2] == 'name':
-            setting_value['value'] = base64.b64decode(setting_value['value']).decode('utf-8')
-        # Gateway user address.
-        elif setting_path[0] == 'gateway' and setting_path[1] == 'user' and setting_path[2] == 'address':
-            if len(setting_value['value']) == 1:
-                user_address = setting_value['value'][0]
-
-                user_address['address'] = base64.b64decode(user_address['address']).decode('utf-8')
-                user_address['city'] = base64.b64decode(user_address['city']).decode('utf-8')
-                user_address['country'] = base64.b64decode(user_address['country']).decode('utf-8')
-                user_address['state'] = base64.b64decode(user_address['state']).decode('utf-8')
-                user_address['zip'] = base64.b64decode(user_address['zip']).decode('utf-8')
-        # Gateway user name, email or phone.
-        elif setting_path[0] == 'gateway' and setting_path[1] == 'user' and setting_path[2] in ['name', 'email', 'phone']:
-            setting_value['value'] = base64.b64decode(setting_value['value']).decode('utf-8')
-        # Gateway installer companyName, contactName, email or phone.
-        elif setting_path[0] == 'gateway' and setting_path[1] == 'installer' and setting_path[2] in ['companyName', 'contactName', 'email', 'phone']:
-            setting_value['value'] = base64.b64decode(setting_value['value']).decode('utf-8')
-
-    elif len(setting_path) == 5:
-        # Auto away users.
-        if setting_path[0] == 'system' and setting_path[1] == 'autoAway' and setting_path[2] == 'users' and setting_path[4] == 'name':
-            setting_value['value'] = base64.b64decode(setting_value['value']).decode('utf-8')
+    # Decode the setting in place (returning the rule's pattern and the number of fields it decoded).
+    if rule is not None:
+        return rule[0], rule[1](setting_value)
+    return None
 
-def convert_easycontrol_json_list(settings_json_list, decode = True, fix_booleans = True):
+def convert_easycontrol_setting(setting_value, decode = True, fix_booleans = True):
+    '''Converts a single EasyControl setting in place and returns its path components'''
+
+    # Error if there is no ID key to identify the setting.
+    if setting_value['id'] is None:
+        raise ValueError('Missing setting key ID.')
+
+    # Each setting has an ID that follows a URL structure; separate by slashes, disregarding the first '/'.
+    settings_path = setting_value['id'].lstrip('/').split('/')
+
+    # Remove the original ID from this setting as it has now been extracted.
+    del setting_value['id']
+
+    # We can fix some boolean types not being stored as JSON booleans.
+    if fix_booleans:
+        for key in ['available', 'recordable', 'used', 'writeable']:
+            if key in setting_value:
+                # Python's bool() sees 'false' as true, so we implement a more conservative conversion.
+                if setting_value[key] in ['false', 0]:
+                    setting_value[key] = False
+                elif setting_value[key] in ['true', 1]:
+                    setting_value[key] = True
+
+    # We can fix some settings being inconsistently Base64 encoded (and the device keys are Base32 encoded).
+    if decode:
+        decode_known_encoded_paths(settings_path, setting_value)
+
+    # Return the path of this setting.
+    return settings_path
+
+def build_settings_dictionary(settings_entries):
+    '''Builds the nested settings dictionary from (path components, setting) entries'''
     # Heavily inspired by https://stackoverflow.com/questions/67440569/python-convert-path-to-dict.
     settings_json_dictionary = {}
 
-    # Each of the list items is an individual setting with a URL path as its ID.
-    for setting_value in settings_json_list:
-        # Error if there is no ID key to identify the setting.
-        if setting_value['id'] is None:
-            raise ValueError('Missing setting key ID.')
-
-        # Each setting has an ID that follows a URL structure; separate by slashes, disregarding the first '/'.
-        settings_path = setting_value['id'].lstrip('/').split('/')
-
-        # Remove the original ID from this setting as it has now been extracted.
-        del setting_value['id']
-
-        # We can fix some boolean types not being stored as JSON booleans.
-        if fix_booleans:
-            for key in ['available', 'recordable', 'used', 'writeable']:
-                if key in setting_value:
-                    # Python's bool() sees 'false' as true, so we implement a more conservative conversion.
-                    if setting_value[key] in ['false', 0]:
-                        setting_value[key] = False
-                    elif setting_value[key] in ['true', 1]:
-                        setting_value[key] = True
-
-        # We can fix some settings being inconsistently Base64 encoded (and the device keys are Base32 encoded).
-        if decode:
-            decode_known_encoded_paths(settings_path, setting_value)
+    # The child settings beneath a field that cannot hold them (these are only an error if no later parent setting overwrites them, as when streaming).
+    misplaced_paths = set()
+
+    for settings_path, setting_value in settings_entries:
+        # A setting overwrites any misplaced child settings beneath it.
+        if misplaced_paths:
+            misplaced_paths = {misplaced_path for misplaced_path in misplaced_paths if len(misplaced_path) <= len(settings_path) or list(misplaced_path[:len(settings_path)]) != settings_path}
 
         # Pop off the last key-value component.
         setting_key = settings_path.pop(-1)
 
-        # Find the target dict starting from the root.
-        target_dict = settings_json_dictionary
-        for component in settings_path:
-            target_dict = target_dict.setdefault(component, {})
+        try:
+            # Find the target dict starting from the root (a setting's dictionary fields hold any child settings beneath them).
+            target_dict = settings_json_dictionary
+            for component in settings_path:
+                target_dict = target_dict.setdefault(component, {})
 
-        # Assign the key and the value.
-        target_dict[setting_key] = dict(sorted(setting_value.items()))
+            # Assign the key and the value (the keys are sorted when the settings are output).
+            target_dict[setting_key] = setting_value
+        except (AttributeError, TypeError):
+            # Any other field cannot hold a child setting.
+            misplaced_paths.add(tuple(settings_path) + (setting_key,))
+
+    # The first misplaced child setting by path is reported (the same one as when streaming).
+    if misplaced_paths:
+        raise ValueError('Setting \'/' + '/'.join(min(misplaced_paths)) + '\' is beneath a setting field.')
 
     # Return the new dictionary.
     return settings_json_dictionary
 
-def main():
-    # Check the program arguments.
-    if len(sys.argv) != 2:
-        print('You must specify a ZIP file to convert.')
-        sys.exit(1)
-
-    # Open the ZIP file and read the settings JSON.
-    with zipfile.ZipFile(sys.argv[1]) as settings_archive:
-        # Load the settings_file.
-        with settings_archive.open('Settings_Data.json', mode='r') as settings_file:
-            # Parse the settings_file as a JSON list of settings.
-            settings_json_list = json.load(settings_file)
+def convert_easycontrol_json_list(settings_json_list, decode = True, fix_booleans = True):
+    # Each of the list items is an individual setting with a URL path as its ID (decode encoded values where appropriate and fix JSON boolean types).
+    return build_settings_dictionary((convert_easycontrol_setting(setting_value, decode, fix_booleans), setting_value) for setting_value in settings_json_list)
+
+def flatten_easycontrol_json_list(settings_json_list, decode = True, fix_booleans = True):
+    '''Converts the settings and returns them as a list of (path components, setting) ordered by path'''
+    settings_entries = {}
+
+    # A repeated setting ID overwrites the earlier value.
+    for setting_value in settings_json_list:
+        settings_entries[tuple(convert_easycontrol_setting(setting_value, decode, fix_booleans))] = setting_value
+
+    return sorted(settings_entries.items(), key=lambda entry: entry[0])
+
+def iterate_json_list(settings_file, read_size = 65536):
+    '''Yields the items of a top-level JSON list one at a time from a text file'''
+
+    # The decoder parses one item at a time from the buffer.
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    end_of_file = False
+
+    # We expect the opening bracket, then an item (or closing bracket), then a separator (or closing bracket).
+    expecting = '['
+
+    while True:
+        # Skip any whitespace between the tokens.
+        position = json_whitespace.match(buffer, position).end()
+
+        # Read more of the file when the buffer has been consumed.
+        if position == len(buffer):
+            if end_of_file:
+                raise ValueError('Unexpected end of the JSON list.')
+            chunk = settings_file.read(read_size)
+            buffer = buffer[position:] + chunk
+            position = 0
+            end_of_file = not chunk
+            continue
+
+        if expecting == '[':
+            if buffer[position] != '[':
+                raise ValueError('The settings file is not a JSON list.')
+            position += 1
+            expecting = 'item'
+        elif expecting == 'separator' or (expecting == 'item' and buffer[position] == ']'):
+            if buffer[position] == ']':
+                return
+            if buffer[position] != ',':
+                raise ValueError('Expecting \',\' delimiter in the JSON list.')
+            position += 1
+            expecting = 'next'
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The item may be incomplete, so only give up if the file has nothing more to read.
+                if end_of_file:
+                    raise
+                end = None
+
+            # A value that reaches the end of the buffer (e.g. a number) may continue in the next read.
+            if end is None or (end == len(buffer) and not end_of_file):
+                chunk = settings_file.read(max(read_size, len(buffer)))
+                buffer = buffer[position:] + chunk
+                position = 0
+                end_of_file = not chunk
+                continue
+
+            position = end
+            expecting = 'separator'
+            yield item
+
+def _write_sorted_run(sorted_run):
+    '''Spools a sorted run of (path, sequence, setting) entries to a temporary file'''
+    run_file = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+    for entry in sorted_run:
+        run_file.write(json.dumps(entry, separators=(',', ':')))
+        run_file.write('\n')
+    run_file.seek(0)
+    return run_file
+
+def _read_sorted_run(run_file):
+    '''Reads back a sorted run of (path, sequence, setting) entries from a temporary file'''
+    with run_file:
+        for line in run_file:
+            yield json.loads(line)
+
+def _merge_sorted_runs(runs):
+    '''Merges sorted runs of (path, sequence, setting) entries by path and then input order'''
+    return heapq.merge(*runs, key=lambda entry: (entry[0], entry[1]))
+
+def iterate_sorted_settings(settings_iterable, decode = True, fix_booleans = True, run_size = 10000, maximum_runs = 64):
+    '''Converts settings one at a time and yields them as (path, sequence, setting) ordered by path'''
+
+    # Sorted runs that have been spooled to disk.
+    spooled_runs = []
+    current_run = []
+
+    for sequence, setting_value in enumerate(settings_iterable):
+        # Extract the path of this setting (and decode encoded values where appropriate and fix JSON boolean types).
+        settings_path = convert_easycontrol_setting(setting_value, decode, fix_booleans)
+        current_run.append([settings_path, sequence, setting_value])
+
+        # Spool the run to disk once it is full so memory does not grow with the export size.
+        if len(current_run) >= run_size:
+            current_run.sort(key=lambda entry: entry[0])
+            spooled_runs.append(_write_sorted_run(current_run))
+            current_run = []
+
+            # Cascade the spooled runs into one so we never hold too many files open.
+            if len(spooled_runs) >= maximum_runs:
+                spooled_runs = [_write_sorted_run(_merge_sorted_runs([_read_sorted_run(run_file) for run_file in spooled_runs]))]
+
+    # The final (or only) run stays in memory.
+    current_run.sort(key=lambda entry: entry[0])
+    merged_entries = _merge_sorted_runs([_read_sorted_run(run_file) for run_file in spooled_runs] + [current_run])
+
+    # A repeated setting ID overwrites the earlier value so only the last one is kept.
+    pending_entry = None
+    for entry in merged_entries:
+        if pending_entry is not None and pending_entry[0] != entry[0]:
+            yield pending_entry
+        pending_entry = entry
+
+    if pending_entry is not None:
+        yield pending_entry
+
+def write_sorted_settings(sorted_settings, output_files, indent = 2, ensure_ascii = True):
+    '''Writes settings ordered by path as the same JSON text as json.dumps(..., indent=indent, sort_keys=True) on the converted dictionary (or compact JSON text when indent is None)'''
+
+    # Compact JSON text has no new lines and no space after the key.
+    newline = '\n' if indent is not None else ''
+    key_separator = ': ' if indent is not None else ':'
+    value_separators = None if indent is not None else (',', ':')
+
+    # Each open dictionary tracks its key, how many entries it has, the input order after which entries survive and any setting fields still to be merged.
+    open_dictionaries = [{'key': None, 'count': 0, 'barrier': -1, 'fields': None}]
+    pending_setting = None
+
+    def write(text):
+        for output_file in output_files:
+            output_file.write(text)
+
+    def write_key(key):
+        # The entry belongs to the innermost open dictionary.
+        dictionary = open_dictionaries[-1]
+        entry_indent = newline + (' ' * (indent or 0) * len(open_dictionaries))
+        write((',' if dictionary['count'] else '') + entry_indent + json.dumps(key, ensure_ascii=ensure_ascii) + key_separator)
+        dictionary['count'] += 1
+        return entry_indent
+
+    def write_entry(key, value):
+        # Any value (including null) is written in full (compact UTF-8 values are encoded as Settings_Output encodes them, so they match with or without orjson).
+        entry_indent = write_key(key)
+        if indent is None and not ensure_ascii:
+            write(Settings_Output.dumps_compact(value))
+        else:
+            formatted_value = json.dumps(value, ensure_ascii=ensure_ascii, indent=indent, separators=value_separators, sort_keys=True)
+            write(formatted_value.replace('\n', entry_indent) if indent is not None else formatted_value)
+
+    def open_dictionary(key, barrier, fields = None):
+        # Dictionary values are opened rather than written so entries can be merged into them.
+        write_key(key)
+        write('{')
+        open_dictionaries.append({'key': key, 'count': 0, 'barrier': barrier, 'fields': fields})
+
+    def flush_fields(dictionary, before_key = None):
+        # Setting fields are written in key order amongst any child settings that were merged into the setting.
+        fields = dictionary['fields']
+        while fields and (before_key is None or fields[-1][0] < before_key):
+            write_entry(*fields.pop())
+
+    def take_field(key):
+        # Merge in the innermost dictionary's fields that come before this key, returning the field with this key (which the setting replaces or is merged into).
+        fields = open_dictionaries[-1]['fields']
+        flush_fields(open_dictionaries[-1], key)
+        if fields and fields[-1][0] == key:
+            return fields.pop()
+        return None
+
+    def close_dictionary():
+        flush_fields(open_dictionaries[-1])
+        dictionary = open_dictionaries.pop()
+        write((newline + (' ' * (indent or 0) * len(open_dictionaries)) if dictionary['count'] else '') + '}')
+
+    write('{')
+
+    for settings_path, sequence, setting_value in sorted_settings:
+        # A setting may have child settings beneath it (these are merged into the setting's own dictionary).
+        if pending_setting is not None:
+            pending_path, pending_sequence, pending_value = pending_setting
+            if len(settings_path) > len(pending_path) and settings_path[:len(pending_path)] == pending_path:
+                # A child setting that appeared before its parent setting was overwritten by it.
+                if sequence < pending_sequence:
+                    continue
+
+                # Open the parent setting as a dictionary so the fields and child settings can be merged.
+                open_dictionary(pending_path[-1], pending_sequence, sorted(pending_value.items(), reverse=True))
+            else:
+                write_entry(pending_path[-1], pending_value)
+            pending_setting = None
+
+        # Find how many of the open dictionaries this setting shares.
+        common_depth = 0
+        while common_depth + 1 < len(open_dictionaries) and common_depth + 1 < len(settings_path) and open_dictionaries[common_depth + 1]['key'] == settings_path[common_depth]:
+            common_depth += 1
+
+        # A setting that appeared before one of its parent settings was overwritten by it.
+        if sequence < open_dictionaries[common_depth]['barrier']:
+            continue
+
+        # Close the dictionaries this setting is not part of.
+        while len(open_dictionaries) > common_depth + 1:
+            close_dictionary()
+
+        # Open the dictionaries this setting is nested within (as the dictionary is built, a parent setting's dictionary field is merged into rather than replaced).
+        for component in settings_path[common_depth:-1]:
+            field = take_field(component)
+            if field is None:
+                open_dictionary(component, open_dictionaries[-1]['barrier'])
+            elif isinstance(field[1], dict):
+                open_dictionary(component, open_dictionaries[-1]['barrier'], sorted(field[1].items(), reverse=True))
+            else:
+                # Any other field cannot hold a child setting.
+                raise ValueError('Setting \'/' + '/'.join(settings_path) + '\' is beneath a setting field.')
+
+        # A child setting replaces the parent setting's field of the same name.
+        take_field(settings_path[-1])
+
+        # The setting is written once we know whether any child settings follow it.
+        pending_setting = (settings_path, sequence, setting_value)
+
+    # Write the last setting and close all the dictionaries.
+    if pending_setting is not None:
+        write_entry(pending_setting[0][-1], pending_setting[2])
+
+    while len(open_dictionaries) > 1:
+        close_dictionary()
+
+    write((newline if open_dictionaries[0]['count'] else '') + '}')
+
+def stream_easycontrol_json_list(settings_file, output_files, decode = True, fix_booleans = True, run_size = 10000, output_format = 'pretty'):
+    '''Converts a settings JSON list text file straight to the output files without holding the whole export in memory'''
+    sorted_settings = iterate_sorted_settings(iterate_json_list(settings_file), decode, fix_booleans, run_size)
+
+    if output_format == 'ndjson':
+        Settings_Output.write_settings_ndjson(((settings_path, setting_value) for settings_path, sequence, setting_value in sorted_settings), output_files)
+    else:
+        # Only the pretty format escapes non-ASCII characters (as it always has).
+        write_sorted_settings(sorted_settings, output_files, 2 if output_format == 'pretty' else None, output_format == 'pretty')
+
+def profile_settings_file(settings_file, output_files, profiler, output_format = 'pretty', decode = True, fix_booleans = True):
+    '''Converts an open (binary) Settings_Data.json in the same way as convert_settings_file but as separately measured stages'''
+
+    # Decompress the settings_file.
+    with profiler.stage('decompress'):
+        settings_data = settings_file.read()
+
+    # Parse the settings data as a JSON list of settings.
+    with profiler.stage('parse'):
+        settings_json_list = json.loads(settings_data)
+    profiler.count('settings', len(settings_json_list))
+    profiler.count('bytes', len(settings_data))
+
+    # Extract the path of each setting, fix JSON boolean types and decode encoded values (counting the fields decoded by each rule).
+    with profiler.stage('decode'):
+        settings_entries = []
+        for setting_value in settings_json_list:
+            settings_path = convert_easycontrol_setting(setting_value, False, fix_booleans)
+            if decode:
+                decoded_rule = decode_known_encoded_paths(settings_path, setting_value)
+                if decoded_rule is not None:
+                    profiler.count_decoded(*decoded_rule)
+            settings_entries.append((settings_path, setting_value))
+
+    # NDJSON has a line per setting so does not need the dictionary.
+    if output_format == 'ndjson':
+        with profiler.stage('tree'):
+            settings_entries = sorted(dict((tuple(settings_path), setting_value) for settings_path, setting_value in settings_entries).items(), key=lambda entry: entry[0])
+        with profiler.stage('serialize'):
+            Settings_Output.write_settings_ndjson(settings_entries, output_files)
+        return
+
+    # Build the proper JSON dictionary.
+    with profiler.stage('tree'):
+        converted_json_settings = build_settings_dictionary(settings_entries)
+
+    # Serialise the converted settings JSON dictionary once for all of the outputs.
+    with profiler.stage('serialize'):
+        Settings_Output.write_settings(converted_json_settings, output_files, output_format)
+
+def convert_settings_file(settings_file, output_files, output_format = 'pretty', stream = False, decode = True, fix_booleans = True, profiler = None):
+    '''Converts an open (binary) Settings_Data.json and writes it to the output files in the requested format (measuring each stage if given a profiler)'''
+
+    # Streaming converts the settings as they are read and writes the output as it goes.
+    if stream:
+        if profiler is None:
+            stream_easycontrol_json_list(io.TextIOWrapper(settings_file, encoding='utf-8-sig'), output_files, decode, fix_booleans, output_format=output_format)
+        else:
+            # The streaming stages are interleaved so are measured as one.
+            with profiler.stage('stream'):
+                stream_easycontrol_json_list(io.TextIOWrapper(settings_file, encoding='utf-8-sig'), output_files, decode, fix_booleans, output_format=output_format)
+        return
+
+    # The profiled conversion is kept separate so there is no cost when not profiling.
+    if profiler is not None:
+        profile_settings_file(settings_file, output_files, profiler, output_format, decode, fix_booleans)
+        return
+
+    # Parse the settings_file as a JSON list of settings.
+    settings_json_list = json.load(settings_file)
+
+    # NDJSON has a line per setting so does not need the dictionary.
+    if output_format == 'ndjson':
+        Settings_Output.write_settings_ndjson(flatten_easycontrol_json_list(settings_json_list, decode, fix_booleans), output_files)
+        return
 
     # Convert the settings JSON list to a proper JSON dictionary (and decode encoded values where appropriate and fix JSON boolean types).
-    converted_json_settings = convert_easycontrol_json_list(settings_json_list)
+    converted_json_settings = convert_easycontrol_json_list(settings_json_list, decode, fix_booleans)
+
+    # Serialise the converted settings JSON dictionary once for all of the outputs.
+    Settings_Output.write_settings(converted_json_settings, output_files, output_format)
+
+def convert_settings_archive(zip_path, output_files, output_format = 'pretty', stream = False, decode = True, fix_booleans = True, cache = None, profiler = None):
+    '''Converts the settings in an exported ZIP file and writes them to the output files in the requested format (returning whether the conversion was cached)'''
+
+    # Open the ZIP file and find the settings JSON.
+    with zipfile.ZipFile(zip_path) as settings_archive:
+        settings_info = settings_archive.getinfo('Settings_Data.json')
+
+        # Without a cache the settings are always converted.
+        if cache is None:
+            with settings_archive.open(settings_info, mode='r') as settings_file:
+                convert_settings_file(settings_file, output_files, output_format, stream, decode, fix_booleans, profiler)
+            return False
+
+        # The same settings converted with the same options have the same output, so a cached conversion skips the conversion entirely.
+        cache_key = cache.get_key(settings_info, decode, fix_booleans, output_format, Settings_Output.get_encoder_name(output_format))
+        if profiler is None:
+            cache_hit = cache.read(cache_key, output_files)
+        else:
+            with profiler.stage('cache'):
+                cache_hit = cache.read(cache_key, output_files)
+            profiler.count('cache_hits' if cache_hit else 'cache_misses')
+
+        if cache_hit:
+            return True
+
+        # Otherwise the conversion is also written to the cache.
+        with cache.store(cache_key) as cache_file:
+            with settings_archive.open(settings_info, mode='r') as settings_file:
+                convert_settings_file(settings_file, output_files + [cache_file], output_format, stream, decode, fix_booleans, profiler)
+        return False
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Converts the JSON list of settings exported from the Bosch EasyControl mobile application to a more readable JSON dictionary of settings.')
+
+    # Arguments to control how the settings are converted.
+    parser.add_argument('zip_file', help='The settings ZIP file exported from the mobile application.')
+    parser.add_argument('-s', '--stream', action='store_true', help='Convert the settings one at a time, writing straight to the output so memory does not grow with the size of the export.')
+    parser.add_argument('-f', '--format', choices=Settings_Output.output_formats, default='pretty', help='Pretty-printed JSON, compact JSON or a JSON line per setting (NDJSON) (default: %(default)s).')
+    parser.add_argument('-z', '--gzip', action='store_true', help='Compress the output file with gzip.')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Do not output the converted settings to the console.')
+    parser.add_argument('-c', '--cache', help='A directory to cache conversions in, so unchanged settings are not converted again.')
+    parser.add_argument('-p', '--profile', nargs='?', const='Settings_Profile.json', help='Measure the wall time, CPU time and peak allocation of each stage and write the report to this file (default: %(const)s).')
+    parser.add_argument('--cache-size', type=int, default=1024, help='The maximum size of the cache in MB (the least recently used conversions are evicted) (default: %(default)s).')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    # Use the conversion cache if requested.
+    cache = Conversion_Cache.ConversionCache(args.cache, args.cache_size * 1024 * 1024) if args.cache else None
+
+    # Measure each stage if requested.
+    profiler = Settings_Profiler.SettingsProfiler() if args.profile else None
 
-    # The converted settings JSON dictionary as a pretty-printed key ordered string.
-    formatted_settings = json.dumps(converted_json_settings, indent=2, sort_keys=True)
+    # Write the converted settings to the output file (and the console).
+    with Settings_Output.open_output_file(Settings_Output.get_output_file_name(args.format, args.gzip), args.gzip) as output_file:
+        convert_settings_archive(args.zip_file, [output_file] if args.quiet else [sys.stdout, output_file], args.format, args.stream, cache=cache, profiler=profiler)
 
-    # Output the formatted output to the console.
-    print(formatted_settings)
+    # Finish the console output with a new line (as print would).
+    if not args.quiet and args.format != 'ndjson':
+        print()
 
-    # Write the formatted output to the output_file.
-    with open('Settings_Data_Converted.json', mode='w', encoding='utf-8') as output_file:
-        output_file.write(formatted_settings)
+    # Write the profile report.
+    if profiler is not None:
+        profiler.write_report(args.profile)
 
 # Launch the main method if invoked directly.
 if __name__ == '__main__':
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We encode some of the values as the mobile application does.
+import base64
+
+# We process JSON files.
+import json
+
+# We create the output directory.
+import os
+
+# We generate the settings from a seed so they can be reproduced.
+import random
+
+# We write ZIP files.
+import zipfile
+
+# The boolean fields are exported as JSON booleans, strings or integers.
+boolean_representations = [True, False, 'true', 'false', 1, 0]
+
+def encode_base64_text(text):
+    '''Encodes UTF-8 text as Base64'''
+    return base64.b64encode(text.encode('utf-8')).decode('ascii')
+
+def generate_settings(zones = 4, programs = 4, devices = 8, events = 10, users = 2, heating_circuits = 1, seed = 1471):
+    '''Returns a list of settings in the shape of an EasyControl Settings_Data.json (with the same encoded paths)'''
+    random_generator = random.Random(seed)
+    settings = []
+
+    def add_setting(setting_id, setting_type, value, **fields):
+        setting = {'id': setting_id, 'type': setting_type, 'value': value}
+
+        # Not every setting has every boolean field.
+        for key in ['available', 'recordable', 'used', 'writeable']:
+            if random_generator.random() < 0.8:
+                setting[key] = random_generator.choice(boolean_representations)
+
+        setting.update(fields)
+        settings.append(setting)
+
+    def random_name(prefix):
+        # Include some non-ASCII names as found in real installations.
+        return prefix + ' ' + random_generator.choice(['Kitchen', 'Lounge', 'Bedroom', 'Büro', 'Salle à manger', 'Hall']) + ' ' + str(random_generator.randint(1, 99))
+
+    # Zones (the names are Base64 encoded).
+    for zone in range(1, zones + 1):
+        zone_id = '/zones/zn' + str(zone)
+
+        # The zone itself is a setting with a null value (so its fields are merged with the zone's settings).
+        add_setting(zone_id, 'zoneRecord', None)
+        add_setting(zone_id + '/name', 'stringValue', encode_base64_text(random_name('Zone')))
+        add_setting(zone_id + '/temperatureActual', 'floatValue', round(random_generator.uniform(15, 24), 1), unitOfMeasure='C')
+        add_setting(zone_id + '/temperatureHeatingSetpoint', 'floatValue', random_generator.randrange(10, 60) / 2, unitOfMeasure='C', minValue=5, maxValue=30)
+        add_setting(zone_id + '/userMode', 'stringValue', random_generator.choice(['clock', 'manual']), allowedValues=['clock', 'manual'])
+        add_setting(zone_id + '/heatingType', 'stringValue', random_generator.choice(['radiator', 'convector', 'floor']))
+        add_setting(zone_id + '/devices', 'arrayData', ['device' + str(random_generator.randint(1, max(devices, 1)))])
+
+    # Programs (the names are Base64 encoded).
+    for program in range(1, programs + 1):
+        program_id = '/programs/zn' + str(program)
+        add_setting(program_id + '/name', 'stringValue', encode_base64_text(random_name('Program')))
+        add_setting(program_id + '/switchPoints', 'switchProgram', [{'dayOfWeek': day, 'setpoint': 'comfort', 'time': random_generator.randrange(0, 1440, 15)} for day in ['Mo', 'Tu', 'We', 'Th', 'Fr', 'Sa', 'Su']])
+
+    # Devices (the device record has a hexadecimal key and a Base64 encoded name, and the device name is also Base64 encoded).
+    for device in range(1, devices + 1):
+        device_id = '/devices/device' + str(device)
+        device_name = random_name('Device')
+        add_setting(device_id, 'arrayData', [{'dlk': format(random_generator.getrandbits(96), '024X'), 'name': encode_base64_text(device_name), 'type': random_generator.choice(['TRV', 'TS', 'SMOKE'])}])
+        add_setting(device_id + '/name', 'stringValue', encode_base64_text(device_name))
+        add_setting(device_id + '/battery', 'stringValue', random_generator.choice(['ok', 'low']))
+        add_setting(device_id + '/signal', 'floatValue', random_generator.randint(-90, -30))
+
+    # Events (the event record has a Base64 encoded name).
+    for event in range(1, events + 1):
+        add_setting('/events/ev' + str(event), 'arrayData', [{'name': encode_base64_text(random_name('Event')), 'start': '2023-01-01T00:00:00', 'duration': random_generator.randint(1, 120)}])
+
+    # Auto away users (the names are Base64 encoded).
+    for user in range(1, users + 1):
+        add_setting('/system/autoAway/users/user' + str(user) + '/name', 'stringValue', encode_base64_text(random_name('User')))
+
+    # Heating circuits (plain values that make up most of the settings read by monitoring).
+    for heating_circuit in range(1, heating_circuits + 1):
+        heating_circuit_id = '/heatingCircuits/hc' + str(heating_circuit)
+        add_setting(heating_circuit_id + '/heatCurveMin', 'floatValue', random_generator.randrange(40, 90) / 2, unitOfMeasure='C')
+        add_setting(heating_circuit_id + '/heatCurveMax', 'floatValue', random_generator.randrange(80, 180) / 2, unitOfMeasure='C')
+        add_setting(heating_circuit_id + '/minSupply', 'floatValue', 20, unitOfMeasure='C')
+        add_setting(heating_circuit_id + '/maxSupply', 'floatValue', random_generator.choice([45, 75, 90]), unitOfMeasure='C')
+        add_setting(heating_circuit_id + '/roomInfluence', 'floatValue', random_generator.randint(0, 3))
+        add_setting(heating_circuit_id + '/summerSetback', 'floatValue', random_generator.randrange(20, 60) / 2, unitOfMeasure='C')
+
+    # The singular settings (energy currency, gateway user and installer).
+    add_setting('/energy/currency', 'stringValue', encode_base64_text(random_generator.choice(['£', '€', '$'])))
+    add_setting('/gateway/user/address', 'arrayData', [{field: encode_base64_text(random_name(field.title())) for field in ['address', 'city', 'country', 'state', 'zip']}])
+    for field in ['name', 'email', 'phone']:
+        add_setting('/gateway/user/' + field, 'stringValue', encode_base64_text(random_name(field.title())))
+    for field in ['companyName', 'contactName', 'email', 'phone']:
+        add_setting('/gateway/installer/' + field, 'stringValue', encode_base64_text(random_name(field.title())))
+
+    # The export does not list the settings in path order.
+    random_generator.shuffle(settings)
+    return settings
+
+def write_settings_archive(zip_path, settings):
+    '''Writes the settings to a ZIP file in the same way as the mobile application export'''
+    with zipfile.ZipFile(zip_path, mode='w', compression=zipfile.ZIP_DEFLATED) as settings_archive:
+        settings_archive.writestr('Settings_Data.json', json.dumps(settings))
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Generates synthetic Bosch EasyControl settings exports for benchmarking.')
+
+    # Arguments to control the size and number of the exports.
+    parser.add_argument('-o', '--output', default='Settings_Synthetic.zip', help='The ZIP file to write (or the directory when generating more than one export) (default: %(default)s).')
+    parser.add_argument('-n', '--exports', type=int, default=1, help='The number of exports to generate (default: %(default)s).')
+    parser.add_argument('--zones', type=int, default=4, help='The number of zones (default: %(default)s).')
+    parser.add_argument('--programs', type=int, default=4, help='The number of programs (default: %(default)s).')
+    parser.add_argument('--devices', type=int, default=8, help='The number of devices (default: %(default)s).')
+    parser.add_argument('--events', type=int, default=10, help='The number of events (default: %(default)s).')
+    parser.add_argument('--users', type=int, default=2, help='The number of auto away users (default: %(default)s).')
+    parser.add_argument('--heating-circuits', type=int, default=1, help='The number of heating circuits (default: %(default)s).')
+    parser.add_argument('--seed', type=int, default=1471, help='The random seed (each further export uses the next seed) (default: %(default)s).')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    # A single export is written to the output file, otherwise the exports are written to the output directory.
+    if args.exports == 1:
+        zip_paths = [args.output]
+    else:
+        os.makedirs(args.output, exist_ok=True)
+        zip_paths = [os.path.join(args.output, 'Settings_Synthetic_' + str(export) + '.zip') for export in range(1, args.exports + 1)]
+
+    for export, zip_path in enumerate(zip_paths):
+        settings = generate_settings(args.zones, args.programs, args.devices, args.events, args.users, args.heating_circuits, args.seed + export)
+        write_settings_archive(zip_path, settings)
+        print('Generated ' + zip_path + ' (' + str(len(settings)) + ' settings).')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We cache the device keys as the same devices appear in every export.
+import functools
+
+# Thanks to https://homematic-forum.de/forum/viewtopic.php?t=65434
+homematic_ip_alphabet = '0123456789ABCEFGHJKLMNPQRSTUWXYZ'
+
+# Every pair of characters (10 bits), so the key can be built two characters at a time.
+homematic_ip_character_pairs = [first + second for first in homematic_ip_alphabet for second in homematic_ip_alphabet]
+
+# Maps the Homematic IP alphabet on to the digits int() understands for base 32.
+homematic_ip_to_base32 = str.maketrans(homematic_ip_alphabet, '0123456789abcdefghijklmnopqrstuv')
+
+def encode_homematic_ip_key(number):
+    '''Converts integer number to Homematic IP key'''
+    character_pairs = []
+
+    # Build the key from the least significant pair of characters and reverse it once at the end.
+    while number > 0:
+        character_pairs.append(homematic_ip_character_pairs[number & 0b1111111111])
+        number >>= 10
+
+    characters = ''.join(reversed(character_pairs)).lstrip('0')
+
+    # Dashes separate the last 6 characters and then up to 3 groups of 5 characters before them (a key that exactly fills a group keeps a leading dash).
+    length = len(characters)
+    if length < 6:
+        return characters
+
+    groups = []
+    previous_cut = 0
+    for cut in (length - 21, length - 16, length - 11, length - 6):
+        if cut >= 0:
+            groups.append(characters[previous_cut:cut])
+            previous_cut = cut
+    groups.append(characters[previous_cut:])
+
+    return '-'.join(groups)
+
+def decode_homematic_ip_key(key):
+    '''Converts Homematic IP key to integer number'''
+    characters = key.replace('-', '').upper()
+
+    # Every character must be in the alphabet (strip removes them all if so).
+    if characters.strip(homematic_ip_alphabet):
+        raise ValueError('\'' + key + '\' is not a Homematic IP key.')
+
+    return int(characters.translate(homematic_ip_to_base32), 32) if characters else 0
+
+@functools.lru_cache(maxsize=65536)
+def hex_to_homematic_ip_key(hex_key):
+    '''Converts a hexadecimal device key (as exported in the dlk field) to Homematic IP key'''
+    return encode_homematic_ip_key(int(hex_key, 16))
+
+@functools.lru_cache(maxsize=65536)
+def homematic_ip_key_to_hex(key, width = 0):
+    '''Converts Homematic IP key to an upper case hexadecimal device key (zero padded to the width)'''
+    return format(decode_homematic_ip_key(key), '0' + str(width) + 'X')
+
+def hex_to_homematic_ip_keys(hex_keys):
+    '''Converts a list of hexadecimal device keys to Homematic IP keys'''
+    return list(map(hex_to_homematic_ip_key, hex_keys))
+
+def homematic_ip_keys_to_hex(keys, width = 0):
+    '''Converts a list of Homematic IP keys to hexadecimal device keys'''
+    return [homematic_ip_key_to_hex(key, width) for key in keys]
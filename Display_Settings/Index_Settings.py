@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We wrap the binary ZIP file member as text.
+import io
+
+# We process JSON files.
+import json
+
+# We get the site names from the file names.
+import os
+
+# We store the index in SQLite.
+import sqlite3
+
+# We time the queries.
+import time
+
+# We process ZIP files.
+import zipfile
+
+# We find the exports the same way as Batch_Convert.
+import Batch_Convert
+
+# We use the same conversion as Display_Settings.
+import Display_Settings
+
+# The settings are keyed by site, export time and path (the path and value index serves both the prefix and the value queries).
+index_schema = '''
+CREATE TABLE IF NOT EXISTS exports (
+    export_id INTEGER PRIMARY KEY,
+    site TEXT NOT NULL,
+    export_time TEXT NOT NULL,
+    source TEXT NOT NULL,
+    crc INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    UNIQUE (site, export_time, crc, size)
+);
+CREATE TABLE IF NOT EXISTS settings (
+    export_id INTEGER NOT NULL REFERENCES exports (export_id),
+    path TEXT NOT NULL,
+    value TEXT,
+    setting TEXT NOT NULL,
+    PRIMARY KEY (export_id, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS settings_path_value ON settings (path, value);
+'''
+
+def open_index(index_path):
+    '''Opens (creating if necessary) a settings index'''
+    connection = sqlite3.connect(index_path)
+
+    # Ingest is write heavy, so trade a little durability on power loss for speed.
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.executescript(index_schema)
+
+    return connection
+
+def get_canonical_value(value):
+    '''Returns a setting value with its whole number floats as integers (so 45 and 45.0 are the same value)'''
+    if isinstance(value, float) and value.is_integer() and abs(value) <= 2 ** 53:
+        return int(value)
+    if isinstance(value, list):
+        return [get_canonical_value(item) for item in value]
+    if isinstance(value, dict):
+        return {key: get_canonical_value(item) for key, item in value.items()}
+    return value
+
+def get_json_value(value):
+    '''Returns the canonical JSON text for a setting value (so equal values are stored identically)'''
+    return json.dumps(get_canonical_value(value), sort_keys=True, separators=(',', ':'))
+
+def ingest_export(connection, zip_path, site, decode = True, fix_booleans = True):
+    '''Adds an export to the index, returning the number of settings added (or None if it was already indexed)'''
+    with zipfile.ZipFile(zip_path) as settings_archive:
+        # The export time is when the settings were written in to the ZIP file (the CRC and size identify its contents without decompressing it).
+        settings_info = settings_archive.getinfo('Settings_Data.json')
+        export_time = '{:04}-{:02}-{:02}T{:02}:{:02}:{:02}'.format(*settings_info.date_time)
+
+        # Only new exports are added.
+        if connection.execute('SELECT 1 FROM exports WHERE site = ? AND export_time = ? AND crc = ? AND size = ?', (site, export_time, settings_info.CRC, settings_info.file_size)).fetchone():
+            return None
+
+        with connection:
+            export_id = connection.execute('INSERT INTO exports (site, export_time, source, crc, size) VALUES (?, ?, ?, ?, ?)', (site, export_time, os.path.abspath(zip_path), settings_info.CRC, settings_info.file_size)).lastrowid
+
+            # Flatten each converted setting to a row (a repeated setting ID overwrites the earlier value).
+            settings = {}
+            with settings_archive.open(settings_info, mode='r') as settings_file:
+                for setting_value in Display_Settings.iterate_json_list(io.TextIOWrapper(settings_file, encoding='utf-8-sig')):
+                    settings_path = '/' + '/'.join(Display_Settings.convert_easycontrol_setting(setting_value, decode, fix_booleans))
+                    settings[settings_path] = setting_value
+
+            connection.executemany('INSERT INTO settings (export_id, path, value, setting) VALUES (?, ?, ?, ?)', ((export_id, settings_path, get_json_value(setting_value.get('value')), get_json_value(setting_value)) for settings_path, setting_value in settings.items()))
+
+    return len(settings)
+
+def query_index(connection, prefix = '/', value = None, site = None, latest = False):
+    '''Returns the (site, export_time, path, value) rows with paths starting with the prefix (optionally also matching a value, a site or only the latest export of each site)'''
+
+    # A prefix is a range of paths, which the index can seek straight to.
+    prefix = '/' + prefix.lstrip('/')
+    conditions = ['settings.path >= ?', 'settings.path < ?']
+    parameters = [prefix, prefix + '\U0010FFFF']
+
+    if value is not None:
+        # The value is compared in the same canonical form it was stored in (so 45 matches 45.0).
+        conditions.append('settings.value = ?')
+        parameters.append(get_json_value(value))
+
+    if site is not None:
+        conditions.append('exports.site = ?')
+        parameters.append(site)
+
+    if latest:
+        conditions.append('exports.export_time = (SELECT MAX(latest.export_time) FROM exports AS latest WHERE latest.site = exports.site)')
+
+    query = 'SELECT exports.site, exports.export_time, settings.path, settings.value FROM settings JOIN exports USING (export_id) WHERE ' + ' AND '.join(conditions) + ' ORDER BY exports.site, exports.export_time, settings.path'
+    return [(row_site, row_export_time, row_path, json.loads(row_value)) for row_site, row_export_time, row_path, row_value in connection.execute(query, parameters)]
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Maintains a persistent index of Bosch EasyControl settings exports for fast path and value queries.')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    # Arguments to control the ingest.
+    parser_ingest = subparsers.add_parser('ingest', help='Add new exports to the index.')
+    parser_ingest.add_argument('index_file', help='The SQLite index file (created if it does not exist).')
+    parser_ingest.add_argument('sources', nargs='+', help='Directories containing settings ZIP files or globs matching them.')
+    parser_ingest.add_argument('--site', help='The site name for the exports (default: the ZIP file name without the extension).')
+    parser_ingest.add_argument('--site-from-directory', action='store_true', help='Use the name of the directory containing each ZIP file as its site name.')
+    parser_ingest.add_argument('--no-decode', dest='decode', action='store_false', help='Index the values as they were encoded.')
+    parser_ingest.add_argument('--no-fix-booleans', dest='fix_booleans', action='store_false', help='Do not fix the boolean types.')
+
+    # Arguments to control the query.
+    parser_query = subparsers.add_parser('query', help='Find the settings with a path prefix (and optionally a value).')
+    parser_query.add_argument('index_file', help='The SQLite index file.')
+    parser_query.add_argument('prefix', nargs='?', default='/', help='The path prefix (e.g. heatingCircuits/hc1/).')
+    parser_query.add_argument('--value', help='Only settings with this value (as JSON, e.g. 45 or \'"text"\'; otherwise taken as text).')
+    parser_query.add_argument('--site', help='Only settings from this site.')
+    parser_query.add_argument('--latest', action='store_true', help='Only settings from the latest export of each site.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    connection = open_index(args.index_file)
+
+    if args.command == 'ingest':
+        added = skipped = failed = 0
+
+        for zip_path in Batch_Convert.find_exports(args.sources):
+            # Work out the site for this export.
+            if args.site:
+                site = args.site
+            elif args.site_from_directory:
+                site = os.path.basename(os.path.dirname(zip_path))
+            else:
+                site = os.path.splitext(os.path.basename(zip_path))[0]
+
+            try:
+                if ingest_export(connection, zip_path, site, args.decode, args.fix_booleans) is None:
+                    skipped += 1
+                else:
+                    added += 1
+            except Exception as error:
+                # A corrupt export is reported but does not stop the ingest (its partial insert is rolled back).
+                print('Failed: ' + zip_path + ' (' + type(error).__name__ + ': ' + str(error) + ')')
+                failed += 1
+
+        print('Added ' + str(added) + ' exports (' + str(skipped) + ' already indexed, ' + str(failed) + ' failed).')
+    else:
+        # A value that is not JSON is taken as text.
+        value = args.value
+        if value is not None:
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+
+        start_time = time.perf_counter()
+        rows = query_index(connection, args.prefix, value, args.site, args.latest)
+        elapsed_milliseconds = (time.perf_counter() - start_time) * 1000
+
+        for row_site, row_export_time, row_path, row_value in rows:
+            print(row_site + '\t' + row_export_time + '\t' + row_path + '\t' + json.dumps(row_value))
+
+        print(str(len(rows)) + ' settings found in ' + format(elapsed_milliseconds, '.1f') + ' ms.')
+
+    connection.close()
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We serialise any read-only mapping of settings (such as a settings view) as a dictionary.
+import collections.abc
+
+# We replace the output file only once it has been written.
+import contextlib
+
+# We optionally compress the output.
+import gzip
+
+# We process JSON files.
+import json
+
+# We write the output beside the file it replaces.
+import os
+
+# orjson is optional but much faster for the compact and NDJSON formats (the pretty format always uses json so its output does not change).
+# orjson does not write numbers in the same way as json (e.g. 1e16 rather than 1e+16 and null rather than NaN), so the cached conversions of each are kept apart.
+# A value orjson cannot encode (e.g. an integer wider than 64 bits) is encoded with json instead.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# The formats the settings can be output in.
+output_formats = ['pretty', 'compact', 'ndjson']
+
+def json_default(value):
+    '''Returns a JSON serialisable form of a read-only mapping of settings (such as a Settings_View.SettingsView), one level at a time'''
+    if isinstance(value, collections.abc.Mapping):
+        return dict(value.items())
+    raise TypeError('Object of type ' + type(value).__name__ + ' is not JSON serializable')
+
+# The pretty and compact formats share the encoders rather than creating them for each output.
+json_encoders = {
+    'pretty': json.JSONEncoder(indent=2, sort_keys=True, default=json_default),
+    'compact': json.JSONEncoder(ensure_ascii=False, separators=(',', ':'), sort_keys=True, default=json_default)
+}
+
+def get_output_extension(output_format = 'pretty', compress = False):
+    '''Returns the file extension for a format'''
+    return ('.ndjson' if output_format == 'ndjson' else '.json') + ('.gz' if compress else '')
+
+def get_output_file_name(output_format = 'pretty', compress = False):
+    '''Returns the name of the converted settings file for a format'''
+    return 'Settings_Data_Converted' + get_output_extension(output_format, compress)
+
+def get_encoder_name(output_format = 'pretty'):
+    '''Returns the name of the library that encodes a format (as their output can differ)'''
+    return 'orjson' if orjson is not None and output_format != 'pretty' else 'json'
+
+@contextlib.contextmanager
+def open_output_file(output_path, compress = False):
+    '''Opens a text output file (gzip compressed if requested), which only replaces any existing file once it has been written without error'''
+    temporary_path = output_path + '.' + str(os.getpid()) + '.tmp'
+
+    try:
+        if compress:
+            with gzip.open(temporary_path, mode='wt', encoding='utf-8') as output_file:
+                yield output_file
+        else:
+            with open(temporary_path, mode='w', encoding='utf-8') as output_file:
+                yield output_file
+
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        # A failed conversion leaves any earlier output as it was.
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+
+def write_chunks(chunks, output_files, buffer_size = 65536):
+    '''Writes the text chunks to every output file, gathering small chunks so each write is worthwhile'''
+    buffered_chunks = []
+    buffered_length = 0
+
+    for chunk in chunks:
+        buffered_chunks.append(chunk)
+        buffered_length += len(chunk)
+
+        if buffered_length >= buffer_size:
+            text = ''.join(buffered_chunks)
+            for output_file in output_files:
+                output_file.write(text)
+            buffered_chunks = []
+            buffered_length = 0
+
+    if buffered_chunks:
+        text = ''.join(buffered_chunks)
+        for output_file in output_files:
+            output_file.write(text)
+
+def dumps_compact(value):
+    '''Returns the compact JSON text of a value (with orjson when it is installed and can encode the value)'''
+    if orjson is None:
+        return json_encoders['compact'].encode(value)
+
+    try:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_SORT_KEYS).decode('utf-8')
+    except TypeError:
+        # Only the parts orjson cannot encode are encoded with json (so the text does not depend on how the output was split up).
+        if isinstance(value, collections.abc.Mapping):
+            return '{' + ','.join(dumps_compact(key) + ':' + dumps_compact(value[key]) for key in sorted(value)) + '}'
+        if isinstance(value, list):
+            return '[' + ','.join(dumps_compact(item) for item in value) + ']'
+        return json_encoders['compact'].encode(value)
+
+def iterencode_settings(settings_dictionary, output_format = 'pretty'):
+    '''Yields the converted settings dictionary as JSON text chunks (the keys are sorted once, here)'''
+    if output_format == 'compact':
+        # Each top level entry is encoded separately so the whole output is never held as a single string.
+        yield '{'
+        for index, key in enumerate(sorted(settings_dictionary)):
+            yield (',' if index else '') + dumps_compact(key) + ':' + dumps_compact(settings_dictionary[key])
+        yield '}'
+    else:
+        yield from json_encoders[output_format].iterencode(settings_dictionary)
+
+def iterencode_ndjson(settings_entries):
+    '''Yields a JSON line for each (path components, setting) entry, with the setting ID as its path field'''
+    for settings_path, setting_value in settings_entries:
+        line = {'path': '/' + '/'.join(settings_path), **setting_value}
+
+        yield dumps_compact(line) + '\n'
+
+def write_settings(settings_dictionary, output_files, output_format = 'pretty'):
+    '''Serialises the converted settings dictionary once and writes it to every output file'''
+    write_chunks(iterencode_settings(settings_dictionary, output_format), output_files)
+
+def write_settings_ndjson(settings_entries, output_files):
+    '''Writes each (path components, setting) entry as a JSON line to every output file'''
+    write_chunks(iterencode_ndjson(settings_entries), output_files)
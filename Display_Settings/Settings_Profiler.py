@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We provide each stage as a context manager.
+import contextlib
+
+# We process JSON files.
+import json
+
+# We time each stage.
+import time
+
+# We measure the peak memory of each stage.
+import tracemalloc
+
+class SettingsProfiler:
+    '''Records the wall time, CPU time and peak allocation of each stage of a conversion, along with counts of the settings and decoded fields'''
+
+    def __init__(self, trace_memory = True):
+        # Tracing the allocations slows the conversion down, so it can be turned off to just measure the times.
+        self.trace_memory = trace_memory
+        self.stages = {}
+        self.counts = {}
+        self.decoded_fields = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        '''Measures the code within the context as a stage (a stage run more than once accumulates its times)'''
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+
+        start_wall_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+
+        try:
+            yield
+        finally:
+            wall_seconds = time.perf_counter() - start_wall_time
+            cpu_seconds = time.process_time() - start_cpu_time
+
+            # The peak is relative to what was already allocated when the stage started.
+            peak_bytes = None
+            if self.trace_memory:
+                peak_bytes = tracemalloc.get_traced_memory()[1] - start_memory
+                if started_tracing:
+                    tracemalloc.stop()
+
+            stage = self.stages.setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_bytes': None})
+            stage['calls'] += 1
+            stage['wall_seconds'] += wall_seconds
+            stage['cpu_seconds'] += cpu_seconds
+            if peak_bytes is not None:
+                stage['peak_bytes'] = max(stage['peak_bytes'] or 0, peak_bytes)
+
+    def count(self, name, amount = 1):
+        '''Adds to a named count (e.g. the number of settings)'''
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def count_decoded(self, pattern, fields):
+        '''Adds the number of fields decoded by an encoded path rule'''
+        self.decoded_fields[pattern] = self.decoded_fields.get(pattern, 0) + fields
+
+    def report(self):
+        '''Returns the machine-readable report of the stages and counts'''
+        return {
+            'stages': self.stages,
+            'counts': self.counts,
+            'decoded_fields': self.decoded_fields,
+            'wall_seconds': sum(stage['wall_seconds'] for stage in self.stages.values()),
+            'cpu_seconds': sum(stage['cpu_seconds'] for stage in self.stages.values())
+        }
+
+    def write_report(self, report_path):
+        '''Writes the report as JSON'''
+        with open(report_path, mode='w', encoding='utf-8') as report_file:
+            json.dump(self.report(), report_file, indent=2, sort_keys=True)
+
+def merge_reports(reports):
+    '''Returns the aggregate of many reports (e.g. across a fleet run), summing the times and counts and keeping the largest peak'''
+    merged_report = {'reports': 0, 'stages': {}, 'counts': {}, 'decoded_fields': {}, 'wall_seconds': 0.0, 'cpu_seconds': 0.0}
+
+    for report in reports:
+        merged_report['reports'] += 1
+        merged_report['wall_seconds'] += report['wall_seconds']
+        merged_report['cpu_seconds'] += report['cpu_seconds']
+
+        for name, stage in report['stages'].items():
+            merged_stage = merged_report['stages'].setdefault(name, {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'peak_bytes': None})
+            merged_stage['calls'] += stage['calls']
+            merged_stage['wall_seconds'] += stage['wall_seconds']
+            merged_stage['cpu_seconds'] += stage['cpu_seconds']
+            if stage['peak_bytes'] is not None:
+                merged_stage['peak_bytes'] = max(merged_stage['peak_bytes'] or 0, stage['peak_bytes'])
+
+        for key in ['counts', 'decoded_fields']:
+            for name, amount in report[key].items():
+                merged_report[key][name] = merged_report[key].get(name, 0) + amount
+
+    return merged_report
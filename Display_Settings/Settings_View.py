@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# The view is a read-only mapping.
+import collections.abc
+
+# We copy the settings that are decoded so the raw list is left as it is.
+import copy
+
+# We process JSON files.
+import json
+
+# We process ZIP files.
+import zipfile
+
+# We use the same conversion as Display_Settings.
+import Display_Settings
+
+class SettingsView(collections.abc.Mapping):
+    '''A read-only view of the converted settings dictionary that only converts the subtrees and settings that are read'''
+
+    def __init__(self, settings_json_list, depth = 0, decode = True, fix_booleans = True):
+        # The raw settings beneath this subtree in the order they were exported (their paths are only split as far as this depth).
+        self.settings_json_list = settings_json_list
+        self.depth = depth
+        self.decode = decode
+        self.fix_booleans = fix_booleans
+
+        # The settings are grouped by their component at this depth on first access, and each value is converted on first read.
+        self.members = None
+        self.converted_values = {}
+
+    def get_members(self):
+        '''Returns the (setting, nested settings) for each key of this subtree, grouping the settings on first access'''
+        if self.members is None:
+            members = {}
+
+            for setting_value in self.settings_json_list:
+                # Error if there is no ID key to identify the setting.
+                if setting_value['id'] is None:
+                    raise ValueError('Missing setting key ID.')
+
+                # Only split the path as far as the component at this depth.
+                settings_path = setting_value['id'].lstrip('/').split('/', self.depth + 1)
+                member = members.setdefault(settings_path[self.depth], [None, []])
+
+                # A setting replaces anything already at its key, while later settings beneath it are merged into it (as they are in the dictionary).
+                if len(settings_path) == self.depth + 1:
+                    member[0] = setting_value
+                    member[1] = []
+                else:
+                    member[1].append(setting_value)
+
+            self.members = members
+
+            # The settings are now held by the members.
+            self.settings_json_list = None
+
+        return self.members
+
+    def convert_setting(self, setting_value, deep_copy = False):
+        '''Returns a converted copy of a raw setting and its path components (only the settings that are decoded or modified are deep copied)'''
+        settings_path = setting_value['id'].lstrip('/').split('/')
+
+        if deep_copy or (self.decode and Display_Settings.find_encoded_path_rule(settings_path) is not None):
+            setting_value = copy.deepcopy(setting_value)
+        else:
+            setting_value = dict(setting_value)
+
+        Display_Settings.convert_easycontrol_setting(setting_value, self.decode, self.fix_booleans)
+        return setting_value, settings_path
+
+    def __getitem__(self, key):
+        # Each value is only converted once.
+        if key in self.converted_values:
+            return self.converted_values[key]
+
+        setting_value, nested_settings = self.get_members()[key]
+
+        if setting_value is None:
+            # A subtree is itself a view.
+            value = SettingsView(nested_settings, self.depth + 1, self.decode, self.fix_booleans)
+        else:
+            value = self.convert_setting(setting_value, deep_copy=bool(nested_settings))[0]
+
+            # Settings exported beneath another setting become fields of it (as they do in the dictionary).
+            for nested_setting in nested_settings:
+                nested_value, settings_path = self.convert_setting(nested_setting, deep_copy=True)
+                target_dict = value
+                for component in settings_path[self.depth + 1:-1]:
+                    target_dict = target_dict.setdefault(component, {})
+                target_dict[settings_path[-1]] = nested_value
+
+        self.converted_values[key] = value
+        return value
+
+    def __iter__(self):
+        return iter(self.get_members())
+
+    def __len__(self):
+        return len(self.get_members())
+
+    def __repr__(self):
+        return 'SettingsView(' + repr(list(self.get_members())) + ')'
+
+    def to_dict(self):
+        '''Returns the whole subtree converted to nested dictionaries (the same as convert_easycontrol_json_list)'''
+        return {key: value.to_dict() if isinstance(value, SettingsView) else value for key, value in self.items()}
+
+def json_default(value):
+    '''Returns a JSON serialisable form of a view one subtree at a time (pass as the default to json.dump, json.dumps or orjson.dumps, or write the view with Settings_Output which already does)'''
+    if isinstance(value, SettingsView):
+        return dict(value.items())
+    raise TypeError('Object of type ' + type(value).__name__ + ' is not JSON serializable')
+
+def view_easycontrol_json_list(settings_json_list, decode = True, fix_booleans = True):
+    '''Returns a lazily converted, read-only view of the settings JSON list (which is not modified)'''
+    settings_view = SettingsView(settings_json_list, 0, decode, fix_booleans)
+
+    # Group the top level now so a setting without an ID is an error here (as it is for convert_easycontrol_json_list).
+    settings_view.get_members()
+    return settings_view
+
+def load_settings_view(settings_path, decode = True, fix_booleans = True):
+    '''Returns a lazily converted, read-only view of the settings in a settings ZIP export or its raw JSON list'''
+
+    # Accept either the exported ZIP file or the Settings_Data.json extracted from it.
+    if zipfile.is_zipfile(settings_path):
+        with zipfile.ZipFile(settings_path) as settings_archive:
+            with settings_archive.open('Settings_Data.json', mode='r') as settings_file:
+                return view_easycontrol_json_list(json.load(settings_file), decode, fix_booleans)
+
+    with open(settings_path, mode='r', encoding='utf-8-sig') as settings_file:
+        return view_easycontrol_json_list(json.load(settings_file), decode, fix_booleans)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We evaluate the heat curves for many installations at once (this module does not import matplotlib so it can be used without a display).
+import numpy
+
+# Pre-defined Weather Dependent Control (WDC) default values.
+heating_types = {
+                 'Radiator': { 'default_start_point_curve': 20, 'default_end_point_curve':75, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':90 },
+                 'Convector': { 'default_start_point_curve': 20, 'default_end_point_curve':75, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':90 },
+                 'Underfloor': { 'default_start_point_curve': 20, 'default_end_point_curve':45, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':45 }
+                }
+
+# The basic heat curve runs from the End Point Curve at -10oC outside to the Start Point Curve at 20oC outside.
+end_point_outside_temperature = -10
+start_point_outside_temperature = 20
+
+# Default example set point, actual room temperature, room influence factor and summer setback threshold.
+default_example_set_point = 20
+default_example_actual_room_temperature = 16
+default_room_influence_factor = 3
+default_example_summer_setback_threshold = 18
+
+# The parameters of an installation's heat curves.
+parameter_names = ['start_point', 'end_point', 'set_point', 'room_temperature', 'room_influence_factor', 'minimum_flow_temperature', 'maximum_flow_temperature', 'summer_setback_threshold']
+
+def get_outside_temperatures(step = 0.01):
+    '''Returns the outside temperatures (-10oC to 20oC) the heat curves are plotted over'''
+    return numpy.arange(end_point_outside_temperature, start_point_outside_temperature + step / 2, step)
+
+def get_default_parameters(heating_type = 'Radiator', count = None):
+    '''Returns the default parameters for a heating type (as arrays of the count of installations when a count is given)'''
+    heating_type = heating_types[heating_type]
+
+    parameters = {
+        'start_point': heating_type['default_start_point_curve'],
+        'end_point': heating_type['default_end_point_curve'],
+        'set_point': default_example_set_point,
+        'room_temperature': default_example_actual_room_temperature,
+        'room_influence_factor': default_room_influence_factor,
+        'minimum_flow_temperature': heating_type['default_min_supply_temperature'],
+        'maximum_flow_temperature': heating_type['default_max_supply_temperature'],
+        'summer_setback_threshold': default_example_summer_setback_threshold
+    }
+
+    if count is not None:
+        return {name: numpy.full(count, value, dtype=float) for name, value in parameters.items()}
+    return parameters
+
+def as_column(parameter):
+    '''Returns a parameter (a value or an array of values for each installation) shaped to broadcast against the outside temperatures'''
+    parameter = numpy.asarray(parameter, dtype=float)
+
+    # A single value gives a single curve, otherwise each installation gets a row.
+    return parameter[..., None] if parameter.ndim else parameter
+
+def basic_heat_curve(start_point, end_point, outside_temperatures, out = None):
+    '''Returns the basic (flow temperature) heat curve from the Start Point Curve and End Point Curve (installations × outside temperatures), optionally calculated in place in out'''
+    # The straight line between the End Point Curve and the Start Point Curve (the same as linspace over -10oC to 20oC).
+    end_point = as_column(end_point)
+    slope = (as_column(start_point) - end_point) / (start_point_outside_temperature - end_point_outside_temperature)
+    heat_curve = numpy.multiply(numpy.subtract(outside_temperatures, end_point_outside_temperature, out=out), slope, out=out)
+    heat_curve += end_point
+    return heat_curve
+
+def set_point_offset(set_point):
+    '''Returns the parallel offset for the set point ( (Set Point – 20°C) x 3°C = Parallel Offset )'''
+    return (numpy.asarray(set_point, dtype=float) - 20) * 3
+
+def room_temperature_offset(set_point, room_temperature, room_influence_factor):
+    '''Returns the parallel offset for the room temperature ( (Set Point – Actual Room Temperature) x Room Influence Factor = Parallel Offset )'''
+    return (numpy.asarray(set_point, dtype=float) - room_temperature) * room_influence_factor
+
+def get_setback_mask(summer_setback_threshold, outside_temperatures, out = None):
+    '''Returns where summer setback applies (the outside temperatures at or above the threshold), optionally calculated in place in out'''
+    return numpy.greater_equal(outside_temperatures, as_column(summer_setback_threshold), out=out)
+
+def limit_heat_curve(heat_curve, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, out = None, setback_mask = None):
+    '''Returns the heat curve with the minimum and maximum flow temperature constraints and summer setback applied (a setback mask that has already been calculated can be reused)'''
+    if setback_mask is None:
+        setback_mask = get_setback_mask(summer_setback_threshold, outside_temperatures)
+
+    # Apply the minimum and maximum flow temperature constraints.
+    limited_heat_curve = numpy.clip(heat_curve, as_column(minimum_flow_temperature), as_column(maximum_flow_temperature), out=out)
+
+    # Apply summer setback (there is no flow at or above the threshold).
+    if out is None:
+        return numpy.where(setback_mask, 0.0, limited_heat_curve)
+    numpy.copyto(out, 0.0, where=setback_mask)
+    return out
+
+def set_point_heat_curve(basic_heat_curve, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, out = None, setback_mask = None):
+    '''Returns the basic heat curve adjusted by the set point with the flow limits applied, optionally calculated in place in out'''
+    heat_curve = numpy.add(basic_heat_curve, as_column(set_point_offset(set_point)), out=out)
+    return limit_heat_curve(heat_curve, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, out, setback_mask)
+
+def room_temperature_heat_curve(basic_heat_curve, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, out = None, setback_mask = None):
+    '''Returns the basic heat curve adjusted by the actual room temperature with the flow limits applied, optionally calculated in place in out'''
+    heat_curve = numpy.add(basic_heat_curve, as_column(room_temperature_offset(set_point, room_temperature, room_influence_factor)), out=out)
+    return limit_heat_curve(heat_curve, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, out, setback_mask)
+
+def evaluate_heat_curves(outside_temperatures, start_point, end_point, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold):
+    '''Returns the basic, adjusted by set point and adjusted by room temperature heat curves for each installation (each parameter is a value or an array with a value per installation)'''
+    basic = basic_heat_curve(start_point, end_point, outside_temperatures)
+
+    # Both adjusted heat curves share the summer setback mask.
+    setback_mask = get_setback_mask(summer_setback_threshold, outside_temperatures)
+    set_point_adjusted = set_point_heat_curve(basic, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, setback_mask=setback_mask)
+    room_temperature_adjusted = room_temperature_heat_curve(basic, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, outside_temperatures, setback_mask=setback_mask)
+    return basic, set_point_adjusted, room_temperature_adjusted
+
+def heat_curve_vertices(start_point, end_point, parallel_offset = 0, minimum_flow_temperature = -numpy.inf, maximum_flow_temperature = numpy.inf, summer_setback_threshold = numpy.inf, minimum_outside_temperature = end_point_outside_temperature, maximum_outside_temperature = start_point_outside_temperature):
+    '''Returns the exact vertices (outside temperatures, flow temperatures) of the heat curves between the outside temperatures, each (installations × 6)
+
+    The curve is the straight line between the End Point Curve and the Start Point Curve moved by the parallel offset and clipped to the
+    minimum and maximum flow temperatures, so the only vertices are the ends and where it meets the flow limits. Summer setback is a
+    step to no flow, so it is two vertices at the threshold. Unused vertices repeat a neighbouring vertex so every curve has 6.
+    '''
+    start_point, end_point, parallel_offset, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold = numpy.broadcast_arrays(*[numpy.asarray(parameter, dtype=float) for parameter in [start_point, end_point, parallel_offset, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold]])
+
+    # The adjusted line (the flow temperature at the End Point Curve's outside temperature and the change per degree).
+    slope = (start_point - end_point) / (start_point_outside_temperature - end_point_outside_temperature)
+    end_point_flow_temperature = end_point + parallel_offset
+
+    # Where the line meets the flow limits (a flat line never meets them).
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        minimum_flow_crossing = end_point_outside_temperature + (minimum_flow_temperature - end_point_flow_temperature) / slope
+        maximum_flow_crossing = end_point_outside_temperature + (maximum_flow_temperature - end_point_flow_temperature) / slope
+
+    # The setback threshold is first so the step is drawn before any other vertex at the same temperature.
+    vertex_temperatures = numpy.stack([summer_setback_threshold, summer_setback_threshold, numpy.full_like(slope, minimum_outside_temperature), minimum_flow_crossing, maximum_flow_crossing, numpy.full_like(slope, maximum_outside_temperature)], axis=-1)
+    vertex_temperatures = numpy.clip(numpy.nan_to_num(vertex_temperatures, nan=minimum_outside_temperature, posinf=maximum_outside_temperature, neginf=minimum_outside_temperature), minimum_outside_temperature, maximum_outside_temperature)
+
+    # Order the vertices by outside temperature (a stable sort keeps the setback vertices in order).
+    vertex_order = numpy.argsort(vertex_temperatures, axis=-1, kind='stable')
+    vertex_temperatures = numpy.take_along_axis(vertex_temperatures, vertex_order, axis=-1)
+
+    # The flow temperature at each vertex with the minimum and maximum flow temperature constraints applied.
+    vertex_flow_temperatures = numpy.clip(end_point_flow_temperature[..., None] + slope[..., None] * (vertex_temperatures - end_point_outside_temperature), minimum_flow_temperature[..., None], maximum_flow_temperature[..., None])
+
+    # There is no flow at or above the summer setback threshold (other than the first setback vertex, which ends the curve before the step).
+    summer_setback_threshold = summer_setback_threshold[..., None]
+    step_vertices = (vertex_order == 0) & (summer_setback_threshold > minimum_outside_temperature)
+    vertex_flow_temperatures[(vertex_temperatures >= summer_setback_threshold) & ~step_vertices] = 0
+    return vertex_temperatures, vertex_flow_temperatures
+
+def basic_heat_curve_vertices(start_point, end_point, minimum_outside_temperature = end_point_outside_temperature, maximum_outside_temperature = start_point_outside_temperature):
+    '''Returns the vertices of the basic heat curves'''
+    return heat_curve_vertices(start_point, end_point, minimum_outside_temperature=minimum_outside_temperature, maximum_outside_temperature=maximum_outside_temperature)
+
+def set_point_heat_curve_vertices(start_point, end_point, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, minimum_outside_temperature = end_point_outside_temperature, maximum_outside_temperature = start_point_outside_temperature):
+    '''Returns the vertices of the heat curves adjusted by the set point with the flow limits applied'''
+    return heat_curve_vertices(start_point, end_point, set_point_offset(set_point), minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, minimum_outside_temperature, maximum_outside_temperature)
+
+def room_temperature_heat_curve_vertices(start_point, end_point, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, minimum_outside_temperature = end_point_outside_temperature, maximum_outside_temperature = start_point_outside_temperature):
+    '''Returns the vertices of the heat curves adjusted by the actual room temperature with the flow limits applied'''
+    return heat_curve_vertices(start_point, end_point, room_temperature_offset(set_point, room_temperature, room_influence_factor), minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, minimum_outside_temperature, maximum_outside_temperature)
+
+def evaluate_heat_curve_vertices(vertex_temperatures, vertex_flow_temperatures, outside_temperatures):
+    '''Returns the flow temperatures of the heat curves at the outside temperatures (installations × outside temperatures), finding each temperature's segment by binary search
+
+    The outside temperatures are either shared by every curve or have a row per curve. Beyond the vertices the curve is held at its end values.
+    '''
+    vertex_temperatures = numpy.asarray(vertex_temperatures, dtype=float)
+    vertex_flow_temperatures = numpy.asarray(vertex_flow_temperatures, dtype=float)
+    outside_temperatures = numpy.asarray(outside_temperatures, dtype=float)
+
+    # Evaluate every curve as a row (a single temperature is a single column).
+    curves_shape = vertex_temperatures.shape[:-1]
+    vertex_count = vertex_temperatures.shape[-1]
+    temperatures_shape = numpy.broadcast_shapes(curves_shape + (1,), outside_temperatures.shape if outside_temperatures.ndim else (1,))
+    vertex_temperatures = vertex_temperatures.reshape(-1, vertex_count)
+    vertex_flow_temperatures = vertex_flow_temperatures.reshape(-1, vertex_count)
+    temperatures = numpy.broadcast_to(outside_temperatures.reshape(outside_temperatures.shape or (1,)), temperatures_shape).reshape(vertex_temperatures.shape[0], -1)
+
+    # Binary search for the number of vertices at or below each temperature (so a temperature on the setback step is on the step's far side).
+    low = numpy.zeros(temperatures.shape, dtype=numpy.intp)
+    high = numpy.full(temperatures.shape, vertex_count, dtype=numpy.intp)
+    for _ in range(vertex_count.bit_length()):
+        middle = (low + high) // 2
+        searching = low < high
+        at_or_below = numpy.take_along_axis(vertex_temperatures, numpy.minimum(middle, vertex_count - 1), axis=-1) <= temperatures
+        low = numpy.where(searching & at_or_below, middle + 1, low)
+        high = numpy.where(searching & ~at_or_below, middle, high)
+
+    # Interpolate along the segment starting at the last of those vertices.
+    segment = numpy.clip(low - 1, 0, vertex_count - 2)
+    segment_start_temperatures = numpy.take_along_axis(vertex_temperatures, segment, axis=-1)
+    segment_end_temperatures = numpy.take_along_axis(vertex_temperatures, segment + 1, axis=-1)
+    segment_start_flow_temperatures = numpy.take_along_axis(vertex_flow_temperatures, segment, axis=-1)
+    segment_end_flow_temperatures = numpy.take_along_axis(vertex_flow_temperatures, segment + 1, axis=-1)
+
+    segment_widths = segment_end_temperatures - segment_start_temperatures
+    fractions = numpy.divide(temperatures - segment_start_temperatures, segment_widths, out=numpy.zeros_like(temperatures), where=segment_widths > 0)
+    flow_temperatures = segment_start_flow_temperatures + numpy.clip(fractions, 0, 1) * (segment_end_flow_temperatures - segment_start_flow_temperatures)
+
+    return flow_temperatures.reshape(temperatures_shape if outside_temperatures.ndim else curves_shape)
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We render the sites across a pool of processes.
+import concurrent.futures
+
+# We process JSON files.
+import json
+
+# We create the output directories and count the CPU cores.
+import os
+
+# We make the site names safe to use as file names.
+import re
+
+# We time each chart.
+import time
+
+# We hide the outermost tick labels (as the simulator does).
+from matplotlib.artist import setp
+
+# We render without a display (the figure is drawn by the Agg backend rather than pyplot, so no window is ever created).
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import matplotlib.font_manager as font_manager
+
+# The heat curve calculations.
+import Heat_Curve
+
+# The chart formats that can be written.
+output_formats = ['png', 'svg']
+
+class HeatCurveChart:
+    '''A heat curve chart styled as the simulator's, whose artists are updated for each site rather than the figure being rebuilt'''
+
+    def __init__(self):
+        heating_type = Heat_Curve.heating_types['Radiator']
+
+        # Create the figure (with space beneath the chart for the settings rather than the simulator's widgets).
+        self.figure = Figure(figsize=(15,6))
+        FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(left=0.15, bottom=0.2)
+
+        # The axes (or chart).
+        self.axes = self.figure.subplots()
+
+        # Annotate the axes.
+        self.axes.set_title('Bosch EasyControl Weather Dependent Control (WDC) Simulator')
+        self.axes.set_xlabel('Outside Temperature (oC)')
+        self.axes.set_ylabel('Flow Temperature (oC)')
+
+        # Add the maximum, minimum flow temperature and summer setback lines.
+        self.line_minimum_flow_temperature = self.axes.axhline(y=heating_type['default_min_supply_temperature'], color='c', linestyle='dashed', label='_Minimum Flow Temperature')
+        self.line_maximum_flow_temperature = self.axes.axhline(y=heating_type['default_max_supply_temperature'], color='r', linestyle='dashed', label='_Maximum Flow Temperature')
+        self.line_summer_setback_threshold = self.axes.axvline(x=Heat_Curve.default_example_summer_setback_threshold, color='y', linestyle='dashed', label='_Summer Setback Threshold')
+
+        # Annotate the limit lines.
+        self.annotation_minimum_flow_temperature = self.axes.annotate('Minimum Flow Temperature', xy=(-10, heating_type['default_min_supply_temperature']), xytext=(-14.5, heating_type['default_min_supply_temperature'] + 1), color='c')
+        self.annotation_maximum_flow_temperature = self.axes.annotate('Maximum Flow Temperature', xy=(20, heating_type['default_max_supply_temperature']), xytext=(20, heating_type['default_max_supply_temperature'] + 1), color='r')
+        self.annotation_summer_setback_threshold = self.axes.annotate('Summer Setback Threshold', xy=(Heat_Curve.default_example_summer_setback_threshold, 0), xytext=(Heat_Curve.default_example_summer_setback_threshold - 0.5, 40), color='y', rotation=90)
+
+        # Plot the heat curves (their vertices are set for each site).
+        self.lines_basic_heat_curve, = self.axes.plot([], [], alpha=0.5, color='k', label='Basic', marker = 'D', markevery=[0,-1])
+        self.lines_set_point_heat_curve, = self.axes.plot([], [], color='b', label='Adjusted by Set Point', marker = 'D', markevery=[0,-1])
+        self.lines_room_temperature_heat_curve, = self.axes.plot([], [], color='g', label='Adjusted by Room Temperature', marker = 'D', markevery=[0,-1])
+
+        # Annotate the plot.
+        self.annotation_basic_heat_curve_start_point = self.axes.annotate('Start\nPoint', xy=(Heat_Curve.start_point_outside_temperature, heating_type['default_start_point_curve']), xytext=(-10, -25), textcoords='offset points')
+        self.annotation_basic_heat_curve_end_point = self.axes.annotate('End\nPoint', xy=(Heat_Curve.end_point_outside_temperature, heating_type['default_end_point_curve']), xytext=(-10, -25), textcoords='offset points')
+
+        # Set the axes display to match the documentation.
+        self.axes.set_xlim(-15, 30)
+        setp(self.axes.get_xticklabels()[0], visible=False)
+        setp(self.axes.get_xticklabels()[-1], visible=False)
+
+        self.axes.set_ylim(0, 90)
+        setp(self.axes.get_yticklabels()[0], visible=False)
+        setp(self.axes.get_yticklabels()[-1], visible=False)
+
+        # Add a grid.
+        self.axes.grid(linestyle='dashed', alpha=0.4)
+
+        # Add a Legend.
+        self.legend = self.axes.legend(title='Heat Curve Legend:', title_fontproperties=font_manager.FontProperties(weight='bold'))
+
+        # The site's name and settings (in place of the simulator's sliders).
+        self.text_site = self.figure.text(0.15, 0.04, '', fontweight='bold')
+        self.text_settings = self.figure.text(0.15, 0.01, '')
+
+    def update(self, name = None, heating_type = 'Radiator', start_point = None, end_point = None, set_point = Heat_Curve.default_example_set_point, room_temperature = Heat_Curve.default_example_actual_room_temperature, room_influence_factor = Heat_Curve.default_room_influence_factor, minimum_flow_temperature = None, maximum_flow_temperature = None, summer_setback_threshold = Heat_Curve.default_example_summer_setback_threshold):
+        '''Updates the chart's artists for a site (the settings and flow limits default to the heating type's and the other settings to the simulator's)'''
+        heating_type_name = heating_type
+        heating_type = Heat_Curve.heating_types[heating_type]
+        if start_point is None:
+            start_point = heating_type['default_start_point_curve']
+        if end_point is None:
+            end_point = heating_type['default_end_point_curve']
+        if minimum_flow_temperature is None:
+            minimum_flow_temperature = heating_type['default_min_supply_temperature']
+        if maximum_flow_temperature is None:
+            maximum_flow_temperature = heating_type['default_max_supply_temperature']
+
+        # The minimum and maximum temperatures cannot overlap (as in the simulator).
+        end_point = max(end_point, start_point)
+        maximum_flow_temperature = max(maximum_flow_temperature, minimum_flow_temperature)
+
+        # Set the vertices for the heat curves.
+        self.lines_basic_heat_curve.set_data(*Heat_Curve.basic_heat_curve_vertices(start_point, end_point))
+        self.lines_set_point_heat_curve.set_data(*Heat_Curve.set_point_heat_curve_vertices(start_point, end_point, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold))
+
+        # The room temperature adjusted heat curve is not applicable without a room influence factor.
+        if room_influence_factor != 0:
+            self.lines_room_temperature_heat_curve.set_data(*Heat_Curve.room_temperature_heat_curve_vertices(start_point, end_point, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold))
+        self.lines_room_temperature_heat_curve.set_visible(room_influence_factor != 0)
+
+        # Move the minimum, maximum and summer setback lines and their annotations.
+        self.line_minimum_flow_temperature.set_ydata([minimum_flow_temperature])
+        self.line_maximum_flow_temperature.set_ydata([maximum_flow_temperature])
+        self.line_summer_setback_threshold.set_xdata([summer_setback_threshold])
+
+        self.annotation_minimum_flow_temperature.set_y(minimum_flow_temperature + 1)
+        self.annotation_maximum_flow_temperature.set_y(maximum_flow_temperature + 1)
+        self.annotation_summer_setback_threshold.set_x(summer_setback_threshold - 0.5)
+
+        # Update the basic heat curve annotations.
+        self.annotation_basic_heat_curve_start_point.xy = (Heat_Curve.start_point_outside_temperature, start_point)
+        self.annotation_basic_heat_curve_end_point.xy = (Heat_Curve.end_point_outside_temperature, end_point)
+
+        # Describe the site.
+        self.text_site.set_text(name or '')
+        self.text_settings.set_text(
+            heating_type_name + ': Start Point Curve ' + format(start_point, 'g') + 'oC, End Point Curve ' + format(end_point, 'g') + 'oC, Set Point ' + format(set_point, 'g') + 'oC'
+            + ((', Room Temperature ' + format(room_temperature, 'g') + 'oC') if room_influence_factor != 0 else '') + ', Room Influence Factor ' + format(room_influence_factor, 'g')
+            + ', Flow ' + format(minimum_flow_temperature, 'g') + 'oC to ' + format(maximum_flow_temperature, 'g') + 'oC, Summer Setback ' + format(summer_setback_threshold, 'g') + 'oC'
+        )
+
+    def save(self, output_path, output_format = None, dpi = 100):
+        '''Writes the chart as a PNG or SVG (by default from the file name)'''
+        self.figure.savefig(output_path, format=output_format, dpi=dpi)
+
+# Each worker process draws every one of its charts on a single chart.
+worker_chart = None
+
+def get_worker_chart():
+    '''Returns this process's chart'''
+    global worker_chart
+    if worker_chart is None:
+        worker_chart = HeatCurveChart()
+    return worker_chart
+
+def get_safe_file_name(name):
+    '''Returns a name with the characters that are not safe in a file name replaced (a name of only dots is empty)'''
+    return re.sub(r'[^\w\- .]', '_', str(name)).strip(' .')
+
+def get_output_path(site, index, output_directory, output_format = 'png'):
+    '''Returns the chart file name and format for a site (its output, otherwise its name or its position in the list), which is always within the output directory
+
+    An output with a .png or .svg extension is written in that format, otherwise the format's extension is added.
+    '''
+    if site.get('output'):
+        # The output may be in a subdirectory but never above the output directory.
+        path_components = [get_safe_file_name(component) for component in re.split(r'[\\/]', str(site['output']))]
+        relative_path = os.path.join(*[component for component in path_components if component] or ['Site_' + str(index + 1)])
+    else:
+        relative_path = get_safe_file_name(site.get('name') or '') or 'Site_' + str(index + 1)
+
+    extension = os.path.splitext(relative_path)[1].lower().lstrip('.')
+    if extension in output_formats:
+        output_format = extension
+    else:
+        relative_path += '.' + output_format
+
+    return os.path.join(output_directory, relative_path), output_format
+
+def get_output_paths(sites, output_directory, output_format = 'png'):
+    '''Returns the chart file name and format for each site, numbering any that would otherwise share a file (so no chart overwrites another)'''
+    output_paths = []
+    used_paths = set()
+
+    for index, site in enumerate(sites):
+        output_path, site_output_format = get_output_path(site, index, output_directory, output_format)
+        path_root, path_extension = os.path.splitext(output_path)
+
+        duplicate = 1
+        while os.path.normcase(output_path) in used_paths:
+            duplicate += 1
+            output_path = path_root + '_' + str(duplicate) + path_extension
+
+        used_paths.add(os.path.normcase(output_path))
+        output_paths.append((output_path, site_output_format))
+
+    return output_paths
+
+def render_site(site, output_path, output_format = 'png', dpi = 100):
+    '''Renders a single site's chart to its output file, returning the outcome rather than raising'''
+    result = {'site': site.get('name'), 'output': output_path, 'status': 'rendered', 'error': None}
+    start_time = time.perf_counter()
+
+    # The remaining keys of the site are the optional parameters of HeatCurveChart.update.
+    parameters = {key: value for key, value in site.items() if key not in ['output']}
+
+    try:
+        # Make sure the output directory exists.
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+
+        chart = get_worker_chart()
+        chart.update(**parameters)
+        chart.save(output_path, output_format, dpi)
+    except Exception as error:
+        # Malformed settings only fail this site.
+        result['status'] = 'failed'
+        result['error'] = type(error).__name__ + ': ' + str(error)
+
+    result['seconds'] = round(time.perf_counter() - start_time, 6)
+    return result
+
+def _render_site_arguments(arguments):
+    '''Unpacks the arguments for render_site (as the process pool maps a single iterable)'''
+    return render_site(*arguments)
+
+def render_sites(sites, output_directory, workers = None, output_format = 'png', dpi = 100):
+    '''Renders the sites' charts across a pool of processes and returns a summary of the run'''
+    start_time = time.perf_counter()
+    work = [(site, output_path, site_output_format, dpi) for site, (output_path, site_output_format) in zip(sites, get_output_paths(sites, output_directory, output_format))]
+
+    # Send the sites to the workers in batches so the pool is not dominated by the cost of each hand-off.
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(work) // (workers * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_render_site_arguments, work, chunksize=chunk_size))
+
+    # Summarise the run.
+    failures = [result for result in results if result['status'] == 'failed']
+    seconds = [result['seconds'] for result in results]
+
+    return {
+        'workers': workers,
+        'total': len(results),
+        'rendered': len(results) - len(failures),
+        'failed': len(failures),
+        'wall_seconds': round(time.perf_counter() - start_time, 6),
+        'render_seconds': round(sum(seconds), 6),
+        'slowest_seconds': max(seconds, default=0),
+        'failures': failures,
+        'results': results
+    }
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Renders the Bosch EasyControl Weather Dependent Control (WDC) heat curve charts of many sites without a display.')
+
+    # Arguments to control what is rendered and where to.
+    parser.add_argument('sites', help='A JSON list of sites, each with a name, optionally an output file name and any of heating_type, start_point, end_point, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature and summer_setback_threshold.')
+    parser.add_argument('-o', '--output', default='Charts', help='The directory to write the charts and the summary to (default: %(default)s).')
+    parser.add_argument('-f', '--format', choices=output_formats, default='png', help='The chart format, unless a site\'s output ends in .png or .svg (default: %(default)s).')
+    parser.add_argument('-d', '--dpi', type=int, default=100, help='The resolution of PNG charts (default: %(default)s).')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='The number of worker processes (default: the number of CPU cores).')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    with open(args.sites, mode='r', encoding='utf-8') as sites_file:
+        sites = json.load(sites_file)
+
+    # Render them all.
+    summary = render_sites(sites, args.output, args.workers, args.format, args.dpi)
+
+    # Write the summary of failures and timings.
+    os.makedirs(args.output, exist_ok=True)
+    with open(os.path.join(args.output, 'Render_Summary.json'), mode='w', encoding='utf-8') as summary_file:
+        json.dump(summary, summary_file, indent=2)
+
+    # Output the failures and the totals to the console.
+    for failure in summary['failures']:
+        print('Failed: ' + str(failure['site']) + ' (' + failure['error'] + ')')
+
+    print('Rendered ' + str(summary['rendered']) + ' of ' + str(summary['total']) + ' charts in ' + format(summary['wall_seconds'], '.2f') + ' seconds using ' + str(summary['workers']) + ' workers.')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
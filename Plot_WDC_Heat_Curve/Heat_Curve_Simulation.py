@@ -0,0 +1,348 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We simulate the sites across a pool of processes.
+import concurrent.futures
+
+# We provide the flow temperature output as a context manager.
+import contextlib
+
+# We process CSV files.
+import csv
+
+# We read the CSV files a chunk at a time.
+import itertools
+
+# We process JSON files.
+import json
+
+# We count the CPU cores.
+import os
+
+# We time the run.
+import time
+
+# We evaluate each chunk of temperatures at once.
+import numpy
+
+# The heat curve calculations.
+import Heat_Curve
+
+# The number of temperatures simulated at a time (the memory used does not depend on the length of the series).
+default_chunk_size = 65536
+
+def is_csv_header(first_row, column = None):
+    '''Returns whether the first row of a CSV is a header (it always is when the column is named, otherwise it is when the temperature is not a number)'''
+    if isinstance(column, str):
+        return True
+
+    try:
+        float(first_row[-1 if column is None else column] or 'nan')
+        return False
+    except ValueError:
+        return True
+
+def read_temperature_chunks(temperatures_path, column = None, chunk_size = default_chunk_size):
+    '''Yields the outside temperatures of a memory-mapped NumPy (.npy) or CSV file a chunk at a time (missing temperatures are NaN)
+
+    The column is the index (or for a CSV with a header, the name) of the temperatures and defaults to the last column.
+    '''
+    if temperatures_path.lower().endswith('.npy'):
+        # Only the pages of each chunk are read from the file.
+        temperatures = numpy.load(temperatures_path, mmap_mode='r')
+        if temperatures.ndim > 1:
+            temperatures = temperatures[:, -1 if column is None else column]
+
+        for chunk_start in range(0, len(temperatures), chunk_size):
+            yield numpy.asarray(temperatures[chunk_start:chunk_start + chunk_size], dtype=float)
+        return
+
+    with open(temperatures_path, mode='r', newline='', encoding='utf-8-sig') as temperatures_file:
+        temperatures_reader = csv.reader(temperatures_file)
+
+        # The first row is either a header or the first temperature.
+        first_row = next(temperatures_reader, None)
+        if first_row is None:
+            return
+
+        column_index = -1 if column is None else column
+        if isinstance(column, str):
+            column_index = first_row.index(column)
+        elif not is_csv_header(first_row, column):
+            temperatures_reader = itertools.chain([first_row], temperatures_reader)
+
+        while True:
+            chunk = numpy.fromiter((float(row[column_index] or 'nan') if row else numpy.nan for row in itertools.islice(temperatures_reader, chunk_size)), dtype=float)
+            if not chunk.size:
+                return
+            yield chunk
+
+@contextlib.contextmanager
+def open_flow_temperature_writer(flow_temperatures_path, temperatures_path, column = None):
+    '''Returns a function that appends each chunk of flow temperatures to a NumPy (.npy) or CSV file (a .npy file needs a .npy temperature series as its length must be known in advance)'''
+    if flow_temperatures_path.lower().endswith('.npy'):
+        if not temperatures_path.lower().endswith('.npy'):
+            raise ValueError('A .npy flow temperature series needs a .npy temperature series.')
+
+        flow_temperatures = numpy.lib.format.open_memmap(flow_temperatures_path, mode='w+', dtype=float, shape=(len(numpy.load(temperatures_path, mmap_mode='r')),))
+        position = 0
+
+        def write_flow_temperatures(chunk):
+            nonlocal position
+            flow_temperatures[position:position + len(chunk)] = chunk
+            position += len(chunk)
+
+        try:
+            yield write_flow_temperatures
+        finally:
+            flow_temperatures.flush()
+            del flow_temperatures
+        return
+
+    # A CSV of temperatures with a header has a flow temperature header, so each flow temperature is on the same row as its outside temperature.
+    has_header = False
+    if not temperatures_path.lower().endswith('.npy'):
+        with open(temperatures_path, mode='r', newline='', encoding='utf-8-sig') as temperatures_file:
+            first_row = next(csv.reader(temperatures_file), None)
+            has_header = first_row is not None and is_csv_header(first_row, column)
+
+    with open(flow_temperatures_path, mode='w', encoding='utf-8') as flow_temperatures_file:
+        if has_header:
+            flow_temperatures_file.write('flow_temperature\n')
+        yield lambda chunk: numpy.savetxt(flow_temperatures_file, chunk, fmt='%.3f')
+
+def simulate_heat_curve(temperature_chunks, start_point = None, end_point = None, heating_type = 'Radiator', set_point = Heat_Curve.default_example_set_point, room_temperature = Heat_Curve.default_example_actual_room_temperature, room_influence_factor = 0, minimum_flow_temperature = None, maximum_flow_temperature = None, summer_setback_threshold = Heat_Curve.default_example_summer_setback_threshold, base_temperature = None, time_step_hours = 1, flow_temperature_writer = None):
+    '''Returns the aggregates of streaming the chunks of outside temperatures through the heat curve, optionally passing each chunk of flow temperatures to a writer
+
+    The curve is adjusted by the set point when the room influence factor is 0 and by the actual room temperature otherwise (as in the simulator).
+    The settings and flow limits default to the heating type's. Outside temperatures beyond -10oC to 20oC are held at the curve's end values.
+    The heating degree-hours are below the base temperature, which defaults to the summer setback threshold.
+    '''
+    heating_type = Heat_Curve.heating_types[heating_type]
+    if start_point is None:
+        start_point = heating_type['default_start_point_curve']
+    if end_point is None:
+        end_point = heating_type['default_end_point_curve']
+    if minimum_flow_temperature is None:
+        minimum_flow_temperature = heating_type['default_min_supply_temperature']
+    if maximum_flow_temperature is None:
+        maximum_flow_temperature = heating_type['default_max_supply_temperature']
+    if base_temperature is None:
+        base_temperature = summer_setback_threshold
+
+    aggregates = {
+        'readings': 0,
+        'missing_readings': 0,
+        'hours': 0.0,
+        'heating_hours': 0.0,
+        'setback_hours': 0.0,
+        'hours_at_maximum_flow': 0.0,
+        'hours_at_minimum_flow': 0.0,
+        'heating_degree_hours': 0.0,
+        'flow_degree_hours': 0.0,
+        'mean_flow_temperature': None,
+        'peak_flow_temperature': None,
+        'minimum_outside_temperature': None,
+        'maximum_outside_temperature': None
+    }
+
+    # Each chunk is calculated in place in these buffers (they only grow to the size of the largest chunk).
+    clipped_temperatures_buffer = numpy.empty(0)
+    flow_temperatures_buffer = numpy.empty(0)
+    setback_mask_buffer = numpy.empty(0, dtype=bool)
+
+    for outside_temperatures in temperature_chunks:
+        readings = len(outside_temperatures)
+        if not readings:
+            continue
+
+        if readings > len(flow_temperatures_buffer):
+            clipped_temperatures_buffer = numpy.empty(readings)
+            flow_temperatures_buffer = numpy.empty(readings)
+            setback_mask_buffer = numpy.empty(readings, dtype=bool)
+
+        clipped_temperatures = numpy.clip(outside_temperatures, Heat_Curve.end_point_outside_temperature, Heat_Curve.start_point_outside_temperature, out=clipped_temperatures_buffer[:readings])
+        flow_temperatures = flow_temperatures_buffer[:readings]
+
+        # Summer setback applies to the actual outside temperatures (which may be above the end of the curve).
+        setback_mask = Heat_Curve.get_setback_mask(summer_setback_threshold, outside_temperatures, out=setback_mask_buffer[:readings])
+
+        basic_heat_curve = Heat_Curve.basic_heat_curve(start_point, end_point, clipped_temperatures, out=flow_temperatures)
+        if room_influence_factor != 0:
+            Heat_Curve.room_temperature_heat_curve(basic_heat_curve, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, clipped_temperatures, out=flow_temperatures, setback_mask=setback_mask)
+        else:
+            Heat_Curve.set_point_heat_curve(basic_heat_curve, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, clipped_temperatures, out=flow_temperatures, setback_mask=setback_mask)
+
+        # There is no flow temperature for a missing outside temperature.
+        missing_mask = numpy.isnan(outside_temperatures)
+        missing_readings = int(numpy.count_nonzero(missing_mask))
+        if missing_readings:
+            flow_temperatures[missing_mask] = numpy.nan
+
+        if flow_temperature_writer is not None:
+            flow_temperature_writer(flow_temperatures)
+
+        # Accumulate the aggregates of this chunk.
+        setback_readings = int(numpy.count_nonzero(setback_mask))
+        heating_readings = readings - missing_readings - setback_readings
+        heating_flow_temperatures = flow_temperatures[~(setback_mask | missing_mask)]
+
+        aggregates['readings'] += readings
+        aggregates['missing_readings'] += missing_readings
+        aggregates['hours'] += (readings - missing_readings) * time_step_hours
+        aggregates['heating_hours'] += heating_readings * time_step_hours
+        aggregates['setback_hours'] += setback_readings * time_step_hours
+        aggregates['hours_at_maximum_flow'] += int(numpy.count_nonzero(heating_flow_temperatures >= maximum_flow_temperature)) * time_step_hours
+        aggregates['hours_at_minimum_flow'] += int(numpy.count_nonzero(heating_flow_temperatures <= minimum_flow_temperature)) * time_step_hours
+        aggregates['heating_degree_hours'] += float(numpy.nansum(numpy.maximum(base_temperature - outside_temperatures, 0))) * time_step_hours
+        aggregates['flow_degree_hours'] += float(heating_flow_temperatures.sum()) * time_step_hours
+
+        if heating_flow_temperatures.size:
+            peak_flow_temperature = float(heating_flow_temperatures.max())
+            if aggregates['peak_flow_temperature'] is None or peak_flow_temperature > aggregates['peak_flow_temperature']:
+                aggregates['peak_flow_temperature'] = peak_flow_temperature
+        if missing_readings < readings:
+            minimum_outside_temperature = float(numpy.nanmin(outside_temperatures))
+            maximum_outside_temperature = float(numpy.nanmax(outside_temperatures))
+            if aggregates['minimum_outside_temperature'] is None or minimum_outside_temperature < aggregates['minimum_outside_temperature']:
+                aggregates['minimum_outside_temperature'] = minimum_outside_temperature
+            if aggregates['maximum_outside_temperature'] is None or maximum_outside_temperature > aggregates['maximum_outside_temperature']:
+                aggregates['maximum_outside_temperature'] = maximum_outside_temperature
+
+    # The mean flow temperature while heating.
+    if aggregates['heating_hours']:
+        aggregates['mean_flow_temperature'] = aggregates['flow_degree_hours'] / aggregates['heating_hours']
+
+    return aggregates
+
+def simulate_site(site, chunk_size = default_chunk_size):
+    '''Simulates a single site, returning the outcome rather than raising'''
+    result = {'site': site.get('name'), 'status': 'simulated', 'error': None, 'aggregates': None}
+    start_time = time.perf_counter()
+
+    # The remaining keys of the site are the optional parameters of simulate_heat_curve.
+    parameters = {key: value for key, value in site.items() if key not in ['name', 'temperatures', 'column', 'flow_temperatures']}
+
+    try:
+        with contextlib.ExitStack() as stack:
+            flow_temperature_writer = None
+            if site.get('flow_temperatures'):
+                flow_temperature_writer = stack.enter_context(open_flow_temperature_writer(site['flow_temperatures'], site['temperatures'], site.get('column')))
+
+            temperature_chunks = read_temperature_chunks(site['temperatures'], site.get('column'), chunk_size)
+            result['aggregates'] = simulate_heat_curve(temperature_chunks, flow_temperature_writer=flow_temperature_writer, **parameters)
+    except Exception as error:
+        # A missing or malformed temperature series only fails this site.
+        result['status'] = 'failed'
+        result['error'] = type(error).__name__ + ': ' + str(error)
+
+    result['seconds'] = round(time.perf_counter() - start_time, 6)
+    return result
+
+def _simulate_site_arguments(arguments):
+    '''Unpacks the arguments for simulate_site (as the process pool maps a single iterable)'''
+    return simulate_site(*arguments)
+
+def simulate_sites(sites, workers = None, chunk_size = default_chunk_size):
+    '''Simulates the sites across a pool of processes and returns a summary of the run'''
+    start_time = time.perf_counter()
+    work = [(site, chunk_size) for site in sites]
+
+    # Each site streams its own series so the sites are handed to the workers one at a time.
+    workers = workers or os.cpu_count() or 1
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_simulate_site_arguments, work))
+
+    # Summarise the run.
+    failures = [result for result in results if result['status'] == 'failed']
+
+    return {
+        'workers': workers,
+        'total': len(results),
+        'simulated': len(results) - len(failures),
+        'failed': len(failures),
+        'wall_seconds': round(time.perf_counter() - start_time, 6),
+        'failures': failures,
+        'results': results
+    }
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Simulates the flow temperatures and heating hours of sites from series of outside temperatures.')
+
+    # Arguments to control what is simulated.
+    parser.add_argument('sites', nargs='?', help='A JSON list of sites to simulate, each with a name, its temperatures (a .npy or CSV file), optionally the column and a flow_temperatures output file, and any of the other options.')
+    parser.add_argument('-i', '--temperatures', help='A .npy or CSV file of outside temperatures for a single site.')
+    parser.add_argument('-c', '--column', help='The column (index or CSV header name) of the outside temperatures (default: the last column).')
+    parser.add_argument('-f', '--flow-temperatures', help='Write the flow temperature series for a single site to this .npy or CSV file.')
+    parser.add_argument('--heating-type', choices=Heat_Curve.heating_types, default='Radiator', help='The heating type whose settings and flow limits are used by default (default: %(default)s).')
+    parser.add_argument('--start-point', type=float, help='The Start Point Curve (default: the heating type\'s).')
+    parser.add_argument('--end-point', type=float, help='The End Point Curve (default: the heating type\'s).')
+    parser.add_argument('--set-point', type=float, default=Heat_Curve.default_example_set_point, help='The set point (default: %(default)s).')
+    parser.add_argument('--room-temperature', type=float, default=Heat_Curve.default_example_actual_room_temperature, help='The actual room temperature (default: %(default)s).')
+    parser.add_argument('--room-influence-factor', type=int, choices=[0, 1, 2, 3], default=0, help='The room influence factor (default: %(default)s).')
+    parser.add_argument('--min-flow', type=float, help='The minimum flow temperature (default: the heating type\'s).')
+    parser.add_argument('--max-flow', type=float, help='The maximum flow temperature (default: the heating type\'s).')
+    parser.add_argument('--summer-setback', type=float, default=Heat_Curve.default_example_summer_setback_threshold, help='The summer setback threshold (default: %(default)s).')
+    parser.add_argument('--base-temperature', type=float, help='The base temperature of the heating degree-hours (default: the summer setback threshold).')
+    parser.add_argument('--time-step', type=float, default=1, help='The hours between each outside temperature (default: %(default)s).')
+
+    # Arguments to control the run.
+    parser.add_argument('--chunk-size', type=int, default=default_chunk_size, help='The number of temperatures simulated at a time (default: %(default)s).')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='The number of worker processes for a list of sites (default: the number of CPU cores).')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    if args.sites:
+        with open(args.sites, mode='r', encoding='utf-8') as sites_file:
+            sites = json.load(sites_file)
+        summary = simulate_sites(sites, args.workers, args.chunk_size)
+    elif args.temperatures:
+        # A numeric column is an index rather than a CSV header name.
+        column = int(args.column) if args.column is not None and args.column.lstrip('-').isdigit() else args.column
+
+        site = {'name': None, 'temperatures': args.temperatures, 'column': column, 'flow_temperatures': args.flow_temperatures, 'heating_type': args.heating_type, 'start_point': args.start_point, 'end_point': args.end_point, 'set_point': args.set_point, 'room_temperature': args.room_temperature, 'room_influence_factor': args.room_influence_factor, 'minimum_flow_temperature': args.min_flow, 'maximum_flow_temperature': args.max_flow, 'summer_setback_threshold': args.summer_setback, 'base_temperature': args.base_temperature, 'time_step_hours': args.time_step}
+        result = simulate_site(site, args.chunk_size)
+        summary = {'workers': 1, 'total': 1, 'simulated': int(result['status'] == 'simulated'), 'failed': int(result['status'] == 'failed'), 'failures': [result] if result['status'] == 'failed' else [], 'results': [result]}
+    else:
+        parser.error('Either a sites file or --temperatures is required.')
+
+    # Write the results.
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as output_file:
+            json.dump(summary, output_file, indent=2)
+
+    # Output the failures and the aggregates to the console.
+    for failure in summary['failures']:
+        print('Failed: ' + str(failure['site']) + ' (' + failure['error'] + ')')
+
+    if not args.sites:
+        for name, value in (summary['results'][0]['aggregates'] or {}).items():
+            print(name + ': ' + (format(value, '.2f') if isinstance(value, float) else str(value)))
+    else:
+        print('Simulated ' + str(summary['simulated']) + ' of ' + str(summary['total']) + ' sites in ' + format(summary['wall_seconds'], '.2f') + ' seconds using ' + str(summary['workers']) + ' workers.')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# This file is part of Bosch-EasyControl-Utilities <https://github.com/Matthew1471/Bosch-EasyControl-Utilities>
+# Copyright (C) 2023 Matthew1471!
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# We parse command line arguments.
+import argparse
+
+# We solve the sites across a pool of processes.
+import concurrent.futures
+
+# We process JSON files.
+import json
+
+# We count the CPU cores.
+import os
+
+# We time the run.
+import time
+
+# We evaluate every setting at once.
+import numpy
+
+# The heat curve calculations.
+import Heat_Curve
+
+# The Start Point Curve and End Point Curve settings the device accepts (the same as the simulator's sliders).
+start_point_range = (20, 45)
+end_point_range = (40, 90)
+setting_step = 0.5
+
+def get_setting_grid():
+    '''Returns every valid (start points, end points) setting on the device's grid (the End Point Curve cannot be below the Start Point Curve)'''
+    start_points = numpy.arange(start_point_range[0], start_point_range[1] + setting_step / 2, setting_step)
+    end_points = numpy.arange(end_point_range[0], end_point_range[1] + setting_step / 2, setting_step)
+
+    start_points, end_points = numpy.meshgrid(start_points, end_points, indexing='ij')
+    valid_settings = start_points <= end_points
+    return start_points[valid_settings], end_points[valid_settings]
+
+def solve_heat_curve(design_outside_temperatures, target_flow_temperatures, heating_type = 'Radiator', set_point = Heat_Curve.default_example_set_point, room_temperature = Heat_Curve.default_example_actual_room_temperature, room_influence_factor = 0, minimum_flow_temperature = None, maximum_flow_temperature = None, summer_setback_threshold = Heat_Curve.default_example_summer_setback_threshold, tolerance = None, limit = None):
+    '''Returns the (start point, end point) settings whose heat curve is closest to the target flow temperatures at the design outside temperatures, ranked by error
+
+    The curve is adjusted by the set point when the room influence factor is 0 and by the actual room temperature otherwise (as in the simulator).
+    The flow limits default to the heating type's. Outside temperatures beyond -10oC to 20oC are held at the curve's end values.
+    Only the settings within the tolerance (of the largest error) are returned when a tolerance is given, and only the best when a limit is given.
+    '''
+    heating_type = Heat_Curve.heating_types[heating_type]
+    if minimum_flow_temperature is None:
+        minimum_flow_temperature = heating_type['default_min_supply_temperature']
+    if maximum_flow_temperature is None:
+        maximum_flow_temperature = heating_type['default_max_supply_temperature']
+
+    design_outside_temperatures = numpy.clip(numpy.asarray(design_outside_temperatures, dtype=float).ravel(), Heat_Curve.end_point_outside_temperature, Heat_Curve.start_point_outside_temperature)
+    target_flow_temperatures = numpy.asarray(target_flow_temperatures, dtype=float).ravel()
+    if design_outside_temperatures.size == 0 or design_outside_temperatures.shape != target_flow_temperatures.shape:
+        raise ValueError('Expected a target flow temperature for each design outside temperature.')
+
+    # Each heat curve is a straight line so the flow temperatures of every setting at the design outside temperatures are evaluated directly (settings × design outside temperatures).
+    start_points, end_points = get_setting_grid()
+    basic_heat_curves = Heat_Curve.basic_heat_curve(start_points, end_points, design_outside_temperatures)
+
+    if room_influence_factor != 0:
+        flow_temperatures = Heat_Curve.room_temperature_heat_curve(basic_heat_curves, set_point, room_temperature, room_influence_factor, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, design_outside_temperatures, out=basic_heat_curves)
+    else:
+        flow_temperatures = Heat_Curve.set_point_heat_curve(basic_heat_curves, set_point, minimum_flow_temperature, maximum_flow_temperature, summer_setback_threshold, design_outside_temperatures, out=basic_heat_curves)
+
+    # The largest and the root mean square errors of each setting (reduced along rows of settings as there are only a few design outside temperatures).
+    errors = numpy.ascontiguousarray((flow_temperatures - target_flow_temperatures).T)
+    maximum_errors = numpy.abs(errors).max(axis=0)
+    rms_errors = numpy.sqrt(numpy.mean(errors * errors, axis=0))
+
+    # Only rank the settings within the tolerance and (with ties) the limit.
+    candidates = numpy.arange(start_points.size)
+    if tolerance is not None:
+        candidates = candidates[maximum_errors <= tolerance]
+    if limit is not None and limit < candidates.size:
+        limit_error = numpy.partition(maximum_errors[candidates], limit - 1)[limit - 1] if limit > 0 else -numpy.inf
+        candidates = candidates[maximum_errors[candidates] <= limit_error]
+
+    # Rank by the largest error, then the root mean square error, then the gentlest curve (the smallest rise from the Start Point Curve to the End Point Curve), then the lowest curve.
+    ranking = candidates[numpy.lexsort((end_points[candidates], end_points[candidates] - start_points[candidates], rms_errors[candidates], maximum_errors[candidates]))]
+    if limit is not None:
+        ranking = ranking[:limit]
+
+    return {
+        'start_point': start_points[ranking],
+        'end_point': end_points[ranking],
+        'maximum_error': maximum_errors[ranking],
+        'rms_error': rms_errors[ranking],
+        'flow_temperatures': flow_temperatures[ranking]
+    }
+
+def solve_site(site, tolerance = None, limit = None):
+    '''Solves a single site, returning the outcome rather than raising'''
+    result = {'site': site.get('name'), 'status': 'solved', 'error': None, 'settings': []}
+
+    # The remaining keys of the site are the optional parameters of solve_heat_curve.
+    parameters = {key: value for key, value in site.items() if key not in ['name', 'targets']}
+
+    try:
+        design_outside_temperatures, target_flow_temperatures = zip(*site['targets']) if site.get('targets') else ((), ())
+        solution = solve_heat_curve(design_outside_temperatures, target_flow_temperatures, tolerance=tolerance, limit=limit, **parameters)
+    except Exception as error:
+        # A malformed site only fails this site.
+        result['status'] = 'failed'
+        result['error'] = type(error).__name__ + ': ' + str(error)
+        return result
+
+    for index in range(len(solution['start_point'])):
+        result['settings'].append({
+            'start_point': float(solution['start_point'][index]),
+            'end_point': float(solution['end_point'][index]),
+            'maximum_error': round(float(solution['maximum_error'][index]), 6),
+            'rms_error': round(float(solution['rms_error'][index]), 6),
+            'flow_temperatures': [round(float(flow_temperature), 6) for flow_temperature in solution['flow_temperatures'][index]]
+        })
+
+    return result
+
+def _solve_site_arguments(arguments):
+    '''Unpacks the arguments for solve_site (as the process pool maps a single iterable)'''
+    return solve_site(*arguments)
+
+def solve_sites(sites, workers = None, tolerance = None, limit = None):
+    '''Solves the sites across a pool of processes and returns a summary of the run'''
+    start_time = time.perf_counter()
+    work = [(site, tolerance, limit) for site in sites]
+
+    # Send the sites to the workers in batches as each site only takes a moment to solve.
+    workers = workers or os.cpu_count() or 1
+    chunk_size = max(1, len(work) // (workers * 4))
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(_solve_site_arguments, work, chunksize=chunk_size))
+
+    # Summarise the run.
+    failures = [result for result in results if result['status'] == 'failed']
+
+    return {
+        'workers': workers,
+        'total': len(results),
+        'solved': len(results) - len(failures),
+        'failed': len(failures),
+        'unsolved': sum(1 for result in results if result['status'] == 'solved' and not result['settings']),
+        'wall_seconds': round(time.perf_counter() - start_time, 6),
+        'failures': failures,
+        'results': results
+    }
+
+def main():
+    # Create an instance of argparse to handle any command line arguments.
+    parser = argparse.ArgumentParser(description='Finds the Start Point Curve and End Point Curve settings that give target flow temperatures at design outside temperatures.')
+
+    # Arguments to control what is solved.
+    parser.add_argument('sites', nargs='?', help='A JSON list of sites to solve, each with a name, its targets ([outside temperature, flow temperature] pairs) and any of the other options.')
+    parser.add_argument('-T', '--target', nargs=2, type=float, action='append', metavar=('OUTSIDE', 'FLOW'), help='A target flow temperature at a design outside temperature for a single site (can be repeated).')
+    parser.add_argument('--heating-type', choices=Heat_Curve.heating_types, default='Radiator', help='The heating type whose flow limits are used by default (default: %(default)s).')
+    parser.add_argument('--set-point', type=float, default=Heat_Curve.default_example_set_point, help='The set point (default: %(default)s).')
+    parser.add_argument('--room-temperature', type=float, default=Heat_Curve.default_example_actual_room_temperature, help='The actual room temperature (default: %(default)s).')
+    parser.add_argument('--room-influence-factor', type=int, choices=[0, 1, 2, 3], default=0, help='The room influence factor (default: %(default)s).')
+    parser.add_argument('--min-flow', type=float, help='The minimum flow temperature (default: the heating type\'s).')
+    parser.add_argument('--max-flow', type=float, help='The maximum flow temperature (default: the heating type\'s).')
+    parser.add_argument('--summer-setback', type=float, default=Heat_Curve.default_example_summer_setback_threshold, help='The summer setback threshold (default: %(default)s).')
+
+    # Arguments to control the results.
+    parser.add_argument('-e', '--tolerance', type=float, default=setting_step, help='The largest error in oC of the settings returned (default: %(default)s).')
+    parser.add_argument('-n', '--limit', type=int, default=10, help='The number of settings returned for each site (default: %(default)s).')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='The number of worker processes for a list of sites (default: the number of CPU cores).')
+    parser.add_argument('-o', '--output', help='Write the results as JSON to this file.')
+
+    # Parse the arguments.
+    args = parser.parse_args()
+
+    if args.sites:
+        with open(args.sites, mode='r', encoding='utf-8') as sites_file:
+            sites = json.load(sites_file)
+        summary = solve_sites(sites, args.workers, args.tolerance, args.limit)
+    elif args.target:
+        site = {'name': None, 'targets': args.target, 'heating_type': args.heating_type, 'set_point': args.set_point, 'room_temperature': args.room_temperature, 'room_influence_factor': args.room_influence_factor, 'minimum_flow_temperature': args.min_flow, 'maximum_flow_temperature': args.max_flow, 'summer_setback_threshold': args.summer_setback}
+        result = solve_site(site, args.tolerance, args.limit)
+        summary = {'workers': 1, 'total': 1, 'solved': int(result['status'] == 'solved'), 'failed': int(result['status'] == 'failed'), 'unsolved': int(result['status'] == 'solved' and not result['settings']), 'failures': [result] if result['status'] == 'failed' else [], 'results': [result]}
+    else:
+        parser.error('Either a sites file or at least one --target is required.')
+
+    # Write the results.
+    if args.output:
+        with open(args.output, mode='w', encoding='utf-8') as output_file:
+            json.dump(summary, output_file, indent=2)
+
+    # Output the failures and the best settings to the console.
+    for failure in summary['failures']:
+        print('Failed: ' + str(failure['site']) + ' (' + failure['error'] + ')')
+
+    if not args.sites:
+        for setting in summary['results'][0]['settings']:
+            print('Start Point Curve ' + format(setting['start_point'], '.1f') + ', End Point Curve ' + format(setting['end_point'], '.1f') + ' (largest error ' + format(setting['maximum_error'], '.2f') + 'oC)')
+        if not summary['results'][0]['settings'] and not summary['failures']:
+            print('No settings are within ' + format(args.tolerance, 'g') + 'oC of the targets.')
+    else:
+        print('Solved ' + str(summary['solved']) + ' of ' + str(summary['total']) + ' sites (' + str(summary['unsolved']) + ' without settings within ' + format(args.tolerance, 'g') + 'oC) in ' + format(summary['wall_seconds'], '.2f') + ' seconds using ' + str(summary['workers']) + ' workers.')
+
+# Launch the main method if invoked directly.
+if __name__ == '__main__':
+    main()
@@ -17,20 +17,29 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 # Import our modules that we are using
-import numpy
+import argparse
+import collections
+import time
 import matplotlib.pyplot as plt
 import matplotlib.font_manager as font_manager
+from matplotlib.transforms import Bbox
 from matplotlib.widgets import Slider, Button, RadioButtons
 
-# Pre-defined Weather Dependent Control (WDC) default values.
-heating_types = {
-                 'Radiator': { 'default_start_point_curve': 20, 'default_end_point_curve':75, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':90 },
-                 'Convector': { 'default_start_point_curve': 20, 'default_end_point_curve':75, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':90 },
-                 'Underfloor': { 'default_start_point_curve': 20, 'default_end_point_curve':45, 'default_min_supply_temperature': 20, 'default_max_supply_temperature':45 }
-                }
+# The heat curve calculations.
+import Heat_Curve
+
+# Create an instance of argparse to handle any command line arguments.
+parser = argparse.ArgumentParser(description='Simulates the Bosch EasyControl Weather Dependent Control (WDC) heat curves.')
+
+# Arguments to control how the figure is redrawn.
+parser.add_argument('-f', '--fast', action='store_true', help='Redraw only the curves and sliders that change (blitting) at most once per frame rather than redrawing the whole figure for each slider event.')
+parser.add_argument('-t', '--frame-time', action='store_true', help='Show how long each redraw takes.')
+
+# Parse the arguments.
+args = parser.parse_args()
 
 # Apply the Bosch EasyControl default values for a Radiator.
-heating_type = heating_types['Radiator']
+heating_type = Heat_Curve.heating_types['Radiator']
 
 # Create the figure.
 figure = plt.figure('Bosch EasyControl Weather Dependent Control (WDC) Simulator', figsize=(15,6))
@@ -47,7 +56,7 @@ axes.set_xlabel('Outside Temperature (oC)')
 axes.set_ylabel('Flow Temperature (oC)')
 
 # Default example temperature for summer setback.
-default_example_summer_setback_threshold = 18
+default_example_summer_setback_threshold = Heat_Curve.default_example_summer_setback_threshold
 
 # Add the maximum, minimum flow temperature and summer setback lines.
 line_minimum_flow_temperature = axes.axhline(y=heating_type['default_min_supply_temperature'], color='c', linestyle='dashed', label='_Minimum Flow Temperature')
@@ -59,47 +68,34 @@ annotation_minimum_flow_temperature = axes.annotate('Minimum Flow Temperature',
 annotation_maximum_flow_temperature = axes.annotate('Maximum Flow Temperature', xy=(20, heating_type['default_max_supply_temperature']), xytext=(20, heating_type['default_max_supply_temperature'] + 1), color='r')
 annotation_summer_setback_threshold = axes.annotate('Summer Setback Threshold', xy=(default_example_summer_setback_threshold, 0), xytext=(default_example_summer_setback_threshold - 0.5, 40), color='y', rotation=90)
 
-# Create the vectors outside_temperatures (-10oC to 20oC) and basic_heat_curve (End Point Curve to Start Point Curve).
-outside_temperatures = numpy.arange(-10, 20.01, 0.01)
-basic_heat_curve = numpy.linspace(heating_type['default_end_point_curve'], heating_type['default_start_point_curve'], len(outside_temperatures))
+# Calculate the vertices (outside temperatures -10oC to 20oC, flow temperatures) of the basic heat curve (End Point Curve to Start Point Curve).
+basic_heat_curve_vertices = Heat_Curve.basic_heat_curve_vertices(heating_type['default_start_point_curve'], heating_type['default_end_point_curve'])
 
 # Plot the initial basic heat curve.
-lines_basic_heat_curve, = axes.plot(outside_temperatures, basic_heat_curve, alpha=0.5, color='k', label='Basic', marker = 'D', markevery=[0,-1])
+lines_basic_heat_curve, = axes.plot(*basic_heat_curve_vertices, alpha=0.5, color='k', label='Basic', marker = 'D', markevery=[0,-1])
 
 # Default example temperature for modelling by set point.
-default_example_set_point = 20
+default_example_set_point = Heat_Curve.default_example_set_point
 
-# Calculate the initial adjusted by set point ( (Set Point – 20°C) x 3°C = Parallel Offset ) heat curve.
-set_point_heat_curve = basic_heat_curve + ((default_example_set_point - 20) * 3)
-
-# Apply the minimum and maximum flow temperature constraints to the initial adjusted by set point heat curve.
-set_point_heat_curve = numpy.clip(set_point_heat_curve, heating_type['default_min_supply_temperature'], heating_type['default_max_supply_temperature'])
-
-# Apply summer setback to the initial adjusted by set point heat curve.
-set_point_heat_curve[outside_temperatures >= default_example_summer_setback_threshold] = 0
+# Calculate the initial adjusted by set point ( (Set Point – 20°C) x 3°C = Parallel Offset ) heat curve with the minimum and maximum flow temperature constraints and summer setback applied.
+set_point_heat_curve_vertices = Heat_Curve.set_point_heat_curve_vertices(heating_type['default_start_point_curve'], heating_type['default_end_point_curve'], default_example_set_point, heating_type['default_min_supply_temperature'], heating_type['default_max_supply_temperature'], default_example_summer_setback_threshold)
 
 # Plot the initial adjusted by set point heat curve with flow limits applied.
-lines_set_point_heat_curve, = axes.plot(outside_temperatures, set_point_heat_curve, color='b', label='Adjusted by Set Point', marker = 'D', markevery=[0,-1])
+lines_set_point_heat_curve, = axes.plot(*set_point_heat_curve_vertices, color='b', label='Adjusted by Set Point', marker = 'D', markevery=[0,-1])
 
 # Default room influence factor and example actual room temperature for modelling by room temperature.
-default_room_influence_factor = 3
-default_example_actual_room_temperature = 16
-
-# Calculate the initial adjusted by room temperature ( (Set Point – Actual Room Temperature) x Room Influence Factor = Parallel Offset ) heat curve.
-room_temperature_heat_curve = basic_heat_curve + ((default_example_set_point - default_example_actual_room_temperature) * default_room_influence_factor)
+default_room_influence_factor = Heat_Curve.default_room_influence_factor
+default_example_actual_room_temperature = Heat_Curve.default_example_actual_room_temperature
 
-# Apply the minimum and maximum flow temperature constraints to the initial adjusted by room temperature heat curve.
-room_temperature_heat_curve = numpy.clip(room_temperature_heat_curve, heating_type['default_min_supply_temperature'], heating_type['default_max_supply_temperature'])
-
-# Apply summer setback to the initial adjusted by room temperature heat curve.
-room_temperature_heat_curve[outside_temperatures >= default_example_summer_setback_threshold] = 0
+# Calculate the initial adjusted by room temperature ( (Set Point – Actual Room Temperature) x Room Influence Factor = Parallel Offset ) heat curve with the minimum and maximum flow temperature constraints and summer setback applied.
+room_temperature_heat_curve_vertices = Heat_Curve.room_temperature_heat_curve_vertices(heating_type['default_start_point_curve'], heating_type['default_end_point_curve'], default_example_set_point, default_example_actual_room_temperature, default_room_influence_factor, heating_type['default_min_supply_temperature'], heating_type['default_max_supply_temperature'], default_example_summer_setback_threshold)
 
 # Plot the initial adjusted by room temperature heat curve with flow limits applied.
-lines_room_temperature_heat_curve, = axes.plot(outside_temperatures, room_temperature_heat_curve, color='g', label='Adjusted by Room Temperature', marker = 'D', markevery=[0,-1])
+lines_room_temperature_heat_curve, = axes.plot(*room_temperature_heat_curve_vertices, color='g', label='Adjusted by Room Temperature', marker = 'D', markevery=[0,-1])
 
 # Annotate the plot.
-annotation_basic_heat_curve_start_point = axes.annotate('Start\nPoint', xy=(outside_temperatures[-1], basic_heat_curve[-1]), xytext=(-10, -25), textcoords='offset points')
-annotation_basic_heat_curve_end_point = axes.annotate('End\nPoint', xy=(outside_temperatures[0], basic_heat_curve[0]), xytext=(-10, -25), textcoords='offset points')
+annotation_basic_heat_curve_start_point = axes.annotate('Start\nPoint', xy=(Heat_Curve.start_point_outside_temperature, heating_type['default_start_point_curve']), xytext=(-10, -25), textcoords='offset points')
+annotation_basic_heat_curve_end_point = axes.annotate('End\nPoint', xy=(Heat_Curve.end_point_outside_temperature, heating_type['default_end_point_curve']), xytext=(-10, -25), textcoords='offset points')
 
 # Set the axes display to match the documentation.
 axes.set_xlim(-15, 30)
@@ -161,7 +157,129 @@ slider_maximum_flow_temperature = Slider(ax=axes_slider_maximum_flow_temperature
 axes_slider_summer_setback_threshold = figure.add_axes(rect=[0.94, radio_influence_bottom - 0.03, vertical_slider_width, vertical_slider_height / 2])
 slider_summer_setback_threshold = Slider(ax=axes_slider_summer_setback_threshold, label='Summer Setback Temp', valmin=10, valmax=30, valinit=default_example_summer_setback_threshold, valstep=0.5, orientation='vertical', color='y', initcolor='none')
 
-def update_heat_curves(val):
+# Blitting draws the changing artists over a saved background of the rest of the figure (only some backends support it).
+use_blit = args.fast and figure.canvas.supports_blit
+
+# The artists on the chart that change as the sliders move (in the order the chart draws them, the spines are drawn over the curves).
+animated_artists = [line_minimum_flow_temperature, line_maximum_flow_temperature, line_summer_setback_threshold, lines_basic_heat_curve, lines_set_point_heat_curve, lines_room_temperature_heat_curve, *axes.spines.values(), annotation_minimum_flow_temperature, annotation_maximum_flow_temperature, annotation_summer_setback_threshold, annotation_basic_heat_curve_start_point, annotation_basic_heat_curve_end_point]
+animated_sliders = [slider_start_point, slider_end_point, slider_example_set_point, slider_example_actual_room_temperature, slider_minimum_flow_temperature, slider_maximum_flow_temperature, slider_summer_setback_threshold]
+
+if use_blit:
+    for animated_artist in animated_artists:
+        animated_artist.set_animated(True)
+
+    # The sliders are redrawn with the curves rather than each requesting a redraw of the whole figure.
+    for animated_slider in animated_sliders:
+        animated_slider.drawon = False
+        animated_slider.ax.set_animated(True)
+
+# The frame time counter is drawn over the figure.
+frame_time_text = figure.text(0.005, 0.01, '', fontsize=8, color='dimgray', animated=True, visible=args.frame_time)
+frame_times = collections.deque(maxlen=30)
+
+# The regions of the figure that are blitted (the chart, each slider and the frame time counter), their saved backgrounds and what was last drawn in them.
+blit_regions = []
+
+def save_blit_regions():
+    # The regions are found again after each full redraw (e.g. the window was resized).
+    renderer = figure.canvas.get_renderer()
+    blit_regions.clear()
+
+    # The chart changes with every slider (the maximum flow temperature annotation can be just above it).
+    blit_regions.append({'bbox': Bbox.from_extents(axes.bbox.x0, axes.bbox.y0, axes.bbox.x1, axes.bbox.y1 + 20), 'artists': animated_artists, 'get_state': None})
+
+    # Each slider only changes with its own value (the margin allows for the value text getting longer without overlapping the neighbouring sliders).
+    for animated_slider in animated_sliders:
+        slider_bbox = Bbox.union([animated_slider.ax.bbox, animated_slider.label.get_window_extent(renderer), animated_slider.valtext.get_window_extent(renderer)]).padded(4)
+        blit_regions.append({'bbox': slider_bbox, 'artists': [animated_slider.ax], 'get_state': lambda animated_slider=animated_slider: (animated_slider.val, animated_slider.ax.get_visible())})
+
+    # The frame time counter changes with its text.
+    blit_regions.append({'bbox': figure.transFigure.transform_bbox(Bbox.from_extents(0, 0, 0.3, 0.05)), 'artists': [frame_time_text], 'get_state': frame_time_text.get_text})
+
+    # Save the background behind each region and draw the changing artists over it.
+    for blit_region in blit_regions:
+        blit_region['background'] = figure.canvas.copy_from_bbox(blit_region['bbox'])
+    for blit_region in blit_regions:
+        for animated_artist in blit_region['artists']:
+            figure.draw_artist(animated_artist)
+        blit_region['state'] = blit_region['get_state']() if blit_region['get_state'] else None
+
+def blit_changed_regions():
+    # Find the regions that have changed since they were last drawn.
+    changed_regions = [blit_region for blit_region in blit_regions if blit_region['get_state'] is None or blit_region['get_state']() != blit_region['state']]
+
+    # Restoring a region's background also erases any region it overlaps, so those are redrawn too.
+    overlapping_region_found = True
+    while overlapping_region_found:
+        overlapping_region_found = False
+        for blit_region in blit_regions:
+            if blit_region not in changed_regions and any(blit_region['bbox'].overlaps(changed_region['bbox']) for changed_region in changed_regions):
+                changed_regions.append(blit_region)
+                overlapping_region_found = True
+
+    # Keep the regions in the order they are drawn in the figure.
+    changed_regions.sort(key=blit_regions.index)
+
+    # Restore the backgrounds, draw the changing artists over them and show only those regions.
+    for blit_region in changed_regions:
+        figure.canvas.restore_region(blit_region['background'])
+    for blit_region in changed_regions:
+        for animated_artist in blit_region['artists']:
+            figure.draw_artist(animated_artist)
+        blit_region['state'] = blit_region['get_state']() if blit_region['get_state'] else None
+    for blit_region in changed_regions:
+        figure.canvas.blit(blit_region['bbox'])
+
+# Slider events arriving within a frame are coalesced into one redraw.
+frame_interval = 16
+frame_timer = figure.canvas.new_timer(interval=frame_interval)
+frame_timer.single_shot = True
+pending_events = 0
+pending_start_time = None
+
+def record_frame_time(frame_seconds, events):
+    # Show the latest frame time and the average of the recent frames (the counter is updated on the next frame).
+    frame_times.append(frame_seconds)
+    frame_time_text.set_text('Frame: {:.1f} ms (average {:.1f} ms, {} events)'.format(frame_seconds * 1000, sum(frame_times) / len(frame_times) * 1000, events))
+
+def on_draw(event):
+    global pending_start_time
+
+    # Saving the figure to a file is not shown on screen.
+    if figure.canvas.is_saving():
+        return
+
+    # A full redraw has finished.
+    if pending_start_time is not None:
+        record_frame_time(time.perf_counter() - pending_start_time, 1)
+        pending_start_time = None
+
+    if use_blit:
+        save_blit_regions()
+    else:
+        figure.draw_artist(frame_time_text)
+
+def draw_frame():
+    global pending_events, pending_start_time
+    start_time = time.perf_counter()
+
+    # Calculate the heat curves once for all of the events since the last frame.
+    events = pending_events
+    pending_events = 0
+    calculate_heat_curves()
+
+    if use_blit and blit_regions:
+        blit_changed_regions()
+        figure.canvas.flush_events()
+        record_frame_time(time.perf_counter() - start_time, events)
+    else:
+        # Without blitting (or before the first full redraw) the whole figure is redrawn.
+        pending_start_time = start_time
+        figure.canvas.draw_idle()
+
+frame_timer.add_callback(draw_frame)
+
+def calculate_heat_curves():
     # The minimum and maximum temperatures cannot overlap.
     if slider_start_point.val > slider_end_point.val:
         slider_end_point.eventson = False
@@ -174,11 +292,11 @@ def update_heat_curves(val):
         slider_maximum_flow_temperature.set_val(slider_minimum_flow_temperature.val)
         slider_maximum_flow_temperature.eventson = True
 
-    # Calculate the basic (flow temperature) heat curve from the start point and end point sliders.
-    basic_heat_curve = numpy.linspace(slider_end_point.val, slider_start_point.val, len(outside_temperatures))
+    # Calculate the vertices of the basic (flow temperature) heat curve from the start point and end point sliders.
+    basic_heat_curve_vertices = Heat_Curve.basic_heat_curve_vertices(slider_start_point.val, slider_end_point.val)
 
-    # Set the Y data range (flow temperature) for the basic heat curve.
-    lines_basic_heat_curve.set_ydata(basic_heat_curve)
+    # Set the vertices for the basic heat curve.
+    lines_basic_heat_curve.set_data(*basic_heat_curve_vertices)
 
     # Move the minimum, maximum and summer setback lines.
     line_minimum_flow_temperature.set_ydata([slider_minimum_flow_temperature.val])
@@ -190,38 +308,26 @@ def update_heat_curves(val):
     annotation_maximum_flow_temperature.set_y(slider_maximum_flow_temperature.val + 1)
     annotation_summer_setback_threshold.set_x(slider_summer_setback_threshold.val - 0.5)
 
-    # Calculate the adjusted by set point ( (Set Point – 20°C) x 3°C = Parallel Offset ) heat curve.
-    set_point_heat_curve = basic_heat_curve + ((slider_example_set_point.val - 20) * 3)
+    # Calculate the adjusted by set point ( (Set Point – 20°C) x 3°C = Parallel Offset ) heat curve with the minimum and maximum flow temperature constraints and summer setback applied.
+    set_point_heat_curve_vertices = Heat_Curve.set_point_heat_curve_vertices(slider_start_point.val, slider_end_point.val, slider_example_set_point.val, slider_minimum_flow_temperature.val, slider_maximum_flow_temperature.val, slider_summer_setback_threshold.val)
 
-    # Apply the minimum and maximum flow temperature constraints to the set point heat curve.
-    set_point_heat_curve = numpy.clip(set_point_heat_curve, slider_minimum_flow_temperature.val, slider_maximum_flow_temperature.val)
-
-    # Apply summer setback to the adjusted by set point heat curve.
-    set_point_heat_curve[outside_temperatures >= slider_summer_setback_threshold.val] = 0
-
-    # Set the Y data range (flow temperature) for the adjusted by set point heat curve with flow limits applied.
-    lines_set_point_heat_curve.set_ydata(set_point_heat_curve)
+    # Set the vertices for the adjusted by set point heat curve with flow limits applied.
+    lines_set_point_heat_curve.set_data(*set_point_heat_curve_vertices)
 
     # Update the basic heat curve annotations.
-    annotation_basic_heat_curve_start_point.xy = (outside_temperatures[-1], slider_start_point.val)
-    annotation_basic_heat_curve_end_point.xy = (outside_temperatures[0], slider_end_point.val)
+    annotation_basic_heat_curve_start_point.xy = (Heat_Curve.start_point_outside_temperature, slider_start_point.val)
+    annotation_basic_heat_curve_end_point.xy = (Heat_Curve.end_point_outside_temperature, slider_end_point.val)
 
     # Lookup the selected room_influence_factor from the currently selected ratio label.
     room_influence_factor = room_influence_factor_dictionary[radio_room_influence_factor.value_selected]
 
     # Is the selected room influence factor not "None (0)"?
     if room_influence_factor != 0:
-        # Calculate the adjusted by room temperature ( (Set Point – Actual Room Temperature) x Room Influence Factor = Parallel Offset ) heat curve.
-        room_temperature_heat_curve = basic_heat_curve + ((slider_example_set_point.val - slider_example_actual_room_temperature.val) * room_influence_factor)
-
-        # Apply the minimum and maximum flow temperature constraints to the room temperature heat curve.
-        room_temperature_heat_curve = numpy.clip(room_temperature_heat_curve, slider_minimum_flow_temperature.val, slider_maximum_flow_temperature.val)
+        # Calculate the adjusted by room temperature ( (Set Point – Actual Room Temperature) x Room Influence Factor = Parallel Offset ) heat curve with the minimum and maximum flow temperature constraints and summer setback applied.
+        room_temperature_heat_curve_vertices = Heat_Curve.room_temperature_heat_curve_vertices(slider_start_point.val, slider_end_point.val, slider_example_set_point.val, slider_example_actual_room_temperature.val, room_influence_factor, slider_minimum_flow_temperature.val, slider_maximum_flow_temperature.val, slider_summer_setback_threshold.val)
 
-        # Apply summer setback to the adjusted by room temperature heat curve.
-        room_temperature_heat_curve[outside_temperatures >= slider_summer_setback_threshold.val] = 0
-
-        # Set the Y data range (flow temperature) for the adjusted by room temperature heat curve with flow limits applied.
-        lines_room_temperature_heat_curve.set_ydata(room_temperature_heat_curve)
+        # Set the vertices for the adjusted by room temperature heat curve with flow limits applied.
+        lines_room_temperature_heat_curve.set_data(*room_temperature_heat_curve_vertices)
 
         # Show the Example Actual Room Temperature slider.
         axes_slider_example_actual_room_temperature.set_visible(True)
@@ -235,8 +341,22 @@ def update_heat_curves(val):
         # Hide the room temperature adjusted heat curve as not applicable.
         lines_room_temperature_heat_curve.set_visible(False)
 
-    # Update the figure.
-    figure.canvas.draw_idle()
+def update_heat_curves(val):
+    global pending_events, pending_start_time
+
+    if args.fast:
+        # Redraw on the next frame (the events before then are coalesced).
+        pending_events += 1
+        if pending_events == 1:
+            frame_timer.start()
+    else:
+        # Update the figure.
+        pending_start_time = time.perf_counter()
+        calculate_heat_curves()
+        figure.canvas.draw_idle()
+
+# Save the background (and time the redraw) after each full redraw.
+figure.canvas.mpl_connect('draw_event', on_draw)
 
 # Set listeners on the widgets.
 slider_start_point.on_changed(update_heat_curves)